@@ -12,11 +12,30 @@ config = dict(
     gunicorn_workers={"default": 1, "type": int},
     gunicorn_timeout={"default": 200, "type": int},
     chunker_lm_path={"default": "utterance_segmentation/models/lm.bin", "type": str},
+    chunker_lm_load_method={"default": "populate_or_lazy", "type": str},
+    chunker_lm_paths={"default": "", "type": str},
+    lm_memory_mb={"default": 0, "type": int},
+    lm_watch_seconds={"default": 0, "type": int},
+    lm_prefault={"default": False, "type": bool},
     max_words_per_sentence={"default": 10, "type": int},
     split_by_punctuation={"default": True, "type": bool},
     max_total_words={"default": 100, "type": int},
+    # Largest word counts requests can ask for instead of the ones above,
+    # 0 for the ones above
+    max_words_per_sentence_limit={"default": 0, "type": int},
+    max_total_words_limit={"default": 0, "type": int},
+    lm_window={"default": 256, "type": int},
+    lm_beam={"default": 0, "type": int},
+    span_cache_size={"default": 20000, "type": int},
+    result_cache_mb={"default": 64, "type": int},
+    result_cache_ttl={"default": 0, "type": int},
     workers={"default": 10, "type": int},
+    executor={"default": "thread", "type": str},
+    process_workers={"default": 0, "type": int},
     use_rpc={"default": True, "type": bool},
+    rpc_async={"default": False, "type": bool},
+    profile_seconds={"default": 10, "type": int},
+    profile_dir={"default": "", "type": str},
 )
 
 
@@ -21,9 +21,9 @@ setup(
     keywords="nlp tts arabic_language segmentation",
     packages=find_packages(exclude=["contrib", "docs", "tests"]),
     install_requires=[
-        "grpcio",
-        "grpcio-health-checking==1.29",
-        "grpcio-reflection==1.29"
+        "grpcio>=1.32",
+        "grpcio-health-checking>=1.32",
+        "grpcio-reflection>=1.32"
 ],
     test_suite="nose2.collector.collector",
     extras_require={
@@ -0,0 +1,445 @@
+"""
+Offline benchmark of the chunker and of both transports, over generated
+Arabic corpora and a KenLM model trained on them, so results only depend on
+the code and the machine. Results are printed as JSON:
+
+    python -m utterance_segmentation.benchmark --output results.json
+
+Every suite runs in a new process, `peak_rss_mb` is the peak resident
+memory of that process, the model it loaded and the servers it started
+included, the processes it started excluded
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent import futures
+
+from config import config
+from utterance_segmentation.chunker import Chunker
+
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+
+# Module serving each transport, and modules it should never import
+TRANSPORT_MODULES = {
+    "grpc": "utterance_segmentation.rpc.server",
+    "http": "utterance_segmentation.http_service",
+}
+UNNEEDED_MODULES = {
+    "grpc": ("flask", "micro_service", "requests", "werkzeug"),
+    "http": ("grpc",),
+}
+
+
+def generate_vocabulary(size, rng):
+    """
+    `size` distinct Arabic looking words of 2 to 7 letters
+    """
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(LETTERS) for _ in range(rng.randint(2, 7))))
+    return sorted(words)
+
+
+def generate_sentences(vocabulary, n_words, rng):
+    """
+    sentences of 3 to 15 words adding up to `n_words` words, words are drawn
+    from a Zipf distribution like words of natural text
+    """
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    sentences = []
+    while n_words > 0:
+        length = min(rng.randint(3, 15), n_words)
+        sentences.append(rng.choices(vocabulary, weights, k=length))
+        n_words -= length
+    return sentences
+
+
+def generate_text(sentences, rng):
+    """
+    text of `sentences`, ended with Arabic punctuation or none
+    """
+    return " ".join(
+        " ".join(sentence) + rng.choice(["", "", ".", "،", "؟"])
+        for sentence in sentences
+    )
+
+
+def generate_ssml(sentences, rng):
+    """
+    SSML of `sentences` using every tag the chunker splits on
+    """
+    parts = []
+    for sentence in sentences:
+        text = " ".join(sentence)
+        parts.append(
+            rng.choice(
+                [
+                    "<p><s>{}</s></p>",
+                    "<s>{}</s>",
+                    '<break time="500ms"/>{}',
+                    '<prosody rate="slow">{}</prosody>',
+                    "{}",
+                ]
+            ).format(text)
+        )
+    return "<speak>{}</speak>".format("".join(parts))
+
+
+def write_arpa(sentences, path):
+    """
+    Write a bigram ARPA model of `sentences`, probabilities are discounted
+    relative frequencies backing off to add-one unigrams
+    """
+    unigrams = Counter()
+    bigrams = Counter()
+    for sentence in sentences:
+        words = ["<s>"] + list(sentence) + ["</s>"]
+        unigrams.update(words)
+        bigrams.update(zip(words, words[1:]))
+
+    total = sum(unigrams.values()) + len(unigrams) + 1
+    backoff = math.log10(0.4)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\\data\\\n")
+        f.write("ngram 1={}\n".format(len(unigrams) + 1))
+        f.write("ngram 2={}\n\n".format(len(bigrams)))
+
+        f.write("\\1-grams:\n")
+        f.write("{:.6f}\t<unk>\t{:.6f}\n".format(math.log10(1 / total), backoff))
+        for word, count in sorted(unigrams.items()):
+            probability = -99 if word == "<s>" else math.log10((count + 1) / total)
+            f.write("{:.6f}\t{}\t{:.6f}\n".format(probability, word, backoff))
+
+        f.write("\n\\2-grams:\n")
+        for (first, second), count in sorted(bigrams.items()):
+            probability = math.log10(0.6 * count / unigrams[first])
+            f.write("{:.6f}\t{} {}\n".format(probability, first, second))
+        f.write("\n\\end\\\n")
+
+
+def percentiles(latencies):
+    """
+    p50, p95 and p99 of `latencies` in milliseconds, nearest rank
+    """
+    latencies = sorted(latencies)
+    result = {}
+    for percentile in (50, 95, 99):
+        rank = max(math.ceil(percentile / 100 * len(latencies)), 1)
+        result["p{}_ms".format(percentile)] = latencies[rank - 1] * 1000
+    return result
+
+
+def peak_rss_mb():
+    """
+    peak resident memory of this process since it started, in MB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def measure(function, inputs, repeat):
+    """
+    latencies and throughput of `function` over `inputs`, `repeat` times
+    """
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for value in inputs:
+            call_started = time.perf_counter()
+            function(value)
+            latencies.append(time.perf_counter() - call_started)
+    seconds = time.perf_counter() - started
+    return dict(
+        percentiles(latencies),
+        requests=len(latencies),
+        requests_per_second=len(latencies) / seconds,
+    )
+
+
+def load_test(send, texts, concurrency, n_requests):
+    """
+    latencies and throughput of `n_requests` calls of `send(text)` by
+    `concurrency` concurrent clients
+    """
+    latencies = []
+
+    def client(index):
+        client_latencies = []
+        for i in range(index, n_requests, concurrency):
+            started = time.perf_counter()
+            send(texts[i % len(texts)])
+            client_latencies.append(time.perf_counter() - started)
+        return client_latencies
+
+    started = time.perf_counter()
+    with futures.ThreadPoolExecutor(concurrency) as executor:
+        for client_latencies in executor.map(client, range(concurrency)):
+            latencies.extend(client_latencies)
+    seconds = time.perf_counter() - started
+    return dict(
+        percentiles(latencies),
+        requests=len(latencies),
+        requests_per_second=len(latencies) / seconds,
+        concurrency=concurrency,
+    )
+
+
+def import_times(module):
+    """
+    cumulative seconds to import every module `import module` imports in a
+    new interpreter, as reported by `python -X importtime`
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # Skip the header
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def run_suite(benchmark, suite, connection):
+    # Runs `suite` in a process of its own, sends its results and the peak
+    # memory of the process or the exception that stopped it
+    try:
+        connection.send((getattr(benchmark, "run_" + suite)(), peak_rss_mb()))
+    except Exception as exception:
+        connection.send(exception)
+    finally:
+        connection.close()
+
+
+class Benchmark(object):
+    """
+    Benchmark suites sharing a generated corpus and its language model
+    """
+
+    def __init__(self, directory, sizes, repeat, concurrency, n_requests, seed):
+
+        self.sizes = sizes
+        self.repeat = repeat
+        self.concurrency = concurrency
+        self.n_requests = n_requests
+
+        rng = random.Random(seed)
+        vocabulary = generate_vocabulary(2000, rng)
+        self.language_model_path = os.path.join(directory, "benchmark.arpa")
+        write_arpa(
+            generate_sentences(vocabulary, 200000, rng), self.language_model_path
+        )
+        # Texts and SSML of each size, and requests of about 100 words for
+        # the transports. They are all generated here, so the inputs of a
+        # suite don't depend on the suites run before it
+        self.texts = {}
+        self.ssml = {}
+        for size in sizes:
+            sentences = generate_sentences(vocabulary, size, rng)
+            self.texts[size] = generate_text(sentences, rng)
+            self.ssml[size] = generate_ssml(sentences, rng)
+        self.request_texts = [
+            generate_text(generate_sentences(vocabulary, 100, rng), rng)
+            for _ in range(50)
+        ]
+
+    def chunker(self):
+        # Texts are chunked whole, whatever their size, and without caches
+        # so repeated runs measure the chunking. Servers run without their
+        # result cache for the same reason
+        return Chunker(
+            self.language_model_path,
+            config["max_words_per_sentence"],
+            config["split_by_punctuation"],
+            max(self.sizes),
+            lm_window=config["lm_window"],
+            lm_beam=config["lm_beam"],
+        )
+
+    def run_chunker(self):
+        chunker = self.chunker()
+        results = []
+        for size, text in self.texts.items():
+            for segmenter_type in ("lm", "max"):
+                result = measure(
+                    lambda text: chunker.run(text, segmenter_type),
+                    [text],
+                    self.repeat,
+                )
+                result.update(words=size, segmenter_type=segmenter_type)
+                result["words_per_second"] = result["requests_per_second"] * size
+                results.append(result)
+        return results
+
+    def run_ssml(self):
+        chunker = self.chunker()
+        results = []
+        for size, ssml in self.ssml.items():
+            result = measure(
+                lambda ssml: chunker.segment(ssml, "lm", parse_ssml=True),
+                [ssml],
+                self.repeat,
+            )
+            result.update(words=size, characters=len(ssml))
+            result["words_per_second"] = result["requests_per_second"] * size
+            results.append(result)
+        return results
+
+    def run_startup(self):
+        # Imports of each transport in a new interpreter, the time to
+        # readiness before the model is loaded
+        results = []
+        for transport, module in TRANSPORT_MODULES.items():
+            latencies = []
+            for _ in range(self.repeat):
+                times = import_times(module)
+                latencies.append(times[module])
+            result = percentiles(latencies)
+            result.update(
+                transport=transport,
+                module=module,
+                modules=len(times),
+                unneeded_modules=[
+                    name for name in UNNEEDED_MODULES[transport] if name in times
+                ],
+            )
+            results.append(result)
+        return results
+
+    def run_grpc(self):
+        import grpc
+
+        import utterance_segmentation.rpc.utterance_segmentation_pb2 as uspb2
+        import utterance_segmentation.rpc.utterance_segmentation_pb2_grpc as uspb2_grpc
+        from utterance_segmentation.api import create_RPC_service
+
+        port = free_port()
+        server = create_RPC_service(
+            port=port, chunker_lm_path=self.language_model_path, result_cache_mb=0
+        )
+        server.start()
+        channel = grpc.insecure_channel("localhost:{}".format(port))
+        stub = uspb2_grpc.utterance_segmentationStub(channel)
+        try:
+            return load_test(
+                lambda text: stub.chunk(uspb2.USRequest(text=text)),
+                self.request_texts,
+                self.concurrency,
+                self.n_requests,
+            )
+        finally:
+            channel.close()
+            server.stop(None)
+
+    def run_http(self):
+        import requests
+        from werkzeug.serving import make_server
+
+        from utterance_segmentation.api import chunker_service
+
+        app = chunker_service(
+            chunker_lm_path=self.language_model_path, result_cache_mb=0
+        )
+        server = make_server("localhost", 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = "http://localhost:{}/chunker".format(server.server_port)
+        sessions = threading.local()
+
+        def send(text):
+            if not hasattr(sessions, "session"):
+                sessions.session = requests.Session()
+            sessions.session.post(url, json={"text": text}).raise_for_status()
+
+        try:
+            return load_test(
+                send, self.request_texts, self.concurrency, self.n_requests
+            )
+        finally:
+            server.shutdown()
+
+    def run(self, suites):
+        """
+        Results of `suites`, each run in a new process so its peak memory is
+        its own
+        """
+        results = dict(
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpus=os.cpu_count(),
+            suites={},
+        )
+        context = multiprocessing.get_context("spawn")
+        for suite in suites:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_suite, args=(self, suite, sender))
+            process.start()
+            sender.close()
+            try:
+                result = receiver.recv()
+            finally:
+                process.join()
+            if isinstance(result, Exception):
+                raise result
+            result, peak = result
+            results["suites"][suite] = dict(results=result, peak_rss_mb=peak)
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--suites", default="startup,chunker,ssml,grpc,http")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        benchmark = Benchmark(
+            directory,
+            [int(size) for size in args.sizes.split(",")],
+            args.repeat,
+            args.concurrency,
+            args.requests,
+            args.seed,
+        )
+        results = benchmark.run(args.suites.split(","))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
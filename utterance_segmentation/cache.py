@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def digest(*parts):
+    """
+    Fixed size key for `parts`, so caches never hold (or copy) large texts
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        encoded = str(part).encode("utf-8")
+        hasher.update(b"%d:" % len(encoded))
+        hasher.update(encoded)
+    return hasher.digest()
+
+
+class LRUCache(object):
+    """
+    Thread-safe least-recently-used cache holding items up to a total weight
+    of `capacity`, a capacity of 0 disables caching.
+
+    Every item weighs 1 unless a `weigh(value)` function is given, and items
+    expire `ttl` seconds after they are added when a `ttl` is given
+    """
+
+    def __init__(self, capacity, weigh=None, ttl=None):
+
+        self.capacity = capacity
+        self.weigh = weigh
+        self.ttl = ttl
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        if self.capacity <= 0:
+            return default
+        with self._lock:
+            try:
+                value, weight, expires = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= time.monotonic():
+                del self._items[key]
+                self.weight -= weight
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        weight = 1 if self.weigh is None else self.weigh(value)
+        # Never let a single item flush the whole cache
+        if weight > self.capacity:
+            return
+        expires = None if not self.ttl else time.monotonic() + self.ttl
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.weight -= previous[1]
+            self._items[key] = (value, weight, expires)
+            self.weight += weight
+            # Evict least recently used items
+            while self.weight > self.capacity:
+                _, (_, evicted_weight, _) = self._items.popitem(last=False)
+                self.weight -= evicted_weight
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.weight = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "weight": self.weight,
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,180 +1,841 @@
+import copy
+import logging
 import re
+import sys
+import time
+from array import array
+from collections import namedtuple
+from itertools import islice
 
 import kenlm
-import requests
 from arabic_analysis import arabic as ar
-from flask import current_app, g
+
+from utterance_segmentation.cache import LRUCache, digest
+from utterance_segmentation.deadline import Deadline
+from utterance_segmentation.utils import InvalidRequest, sentence_length, split_ssml
+
+logger = logging.getLogger(__name__)
+
+NormalizedWords = namedtuple("NormalizedWords", ["tokens", "bounds", "words"])
+
+# A word of the text, its trailing punctuation and the offset of the word
+Token = namedtuple("Token", ["word", "punc", "offset"])
+
+# A chunk and the offsets of the text it was made of, `text[start: end]`, in
+# code points
+Chunk = namedtuple("Chunk", ["text", "start", "end"])
+
+# Binary kenlm models start with this, anything else is ARPA
+KENLM_BINARY_MAGIC = b"mmap lm http://kheafield.com/code"
+
+
+def load_language_model(path, load_method="populate_or_lazy"):
+    """
+    Load a kenlm model. Binary models are memory mapped with `load_method`
+    (a `kenlm.LoadMethod` name), so all processes loading the same file share
+    its pages instead of each holding a private copy
+    """
+    with open(path, "rb") as f:
+        is_binary = f.read(len(KENLM_BINARY_MAGIC)) == KENLM_BINARY_MAGIC
+    if not is_binary:
+        logger.warning(
+            "%s is an ARPA model, every process loading it keeps a private "
+            "copy, convert it with kenlm's build_binary to share it",
+            path,
+        )
+
+    config = kenlm.Config()
+    config.load_method = getattr(kenlm.LoadMethod, load_method.upper())
+    return kenlm.LanguageModel(path, config)
+
+
+# Character tables and patterns, shared by all chunkers
+TASHKEEL_TATWEEL_DICT = {
+    ord(x): None
+    for x in set(ar.ARABIC_TATWEEL) | ar.ARABIC_EXTENDED_TASHKEEL
+    if x != " "
+}
+AR_CHARS = frozenset(
+    {" "} | ar.ARABIC_CHARS | set(ar.ARABIC_TATWEEL) | ar.ARABIC_EXTENDED_TASHKEEL
+)
+# Tashkeel and Tatweel, removed, and runs of non Arabic characters, replaced
+# with a space. Compiled once, they hold nothing of the texts they match
+TASHKEEL_TATWEEL_PATTERN = re.compile(
+    "[{}]+".format(
+        "".join(re.escape(chr(ch)) for ch in sorted(TASHKEEL_TATWEEL_DICT))
+    )
+)
+NON_AR_PATTERN = re.compile(
+    "[^{}]+".format("".join(re.escape(ch) for ch in sorted(AR_CHARS)))
+)
+SPACES_PATTERN = re.compile(" {2,}")
+
+PUNCS = re.escape(
+    "".join(list(ar.ARABIC_PUNC) + ["?", ";", "-", "\n", "@", "#", "$", "="])
+)
+# Sequence of puncs, replaced with the first one when not splitting by
+# punctuation
+REPEATED_PUNCS_PATTERN = re.compile(r"([%s])[%s]+" % (PUNCS, PUNCS + " "))
+
+# Words as in `str.split`, also split after every punctuation when splitting
+# by punctuation, trailing punctuation is the first group
+PUNC_CHARS = re.escape("".join(ch for ch in ar.ARABIC_PUNC if not ch.isspace()))
+PUNC_TOKEN_PATTERN = re.compile(r"(?=\S)[^\s{0}]*([{0}]?)".format(PUNC_CHARS))
+WORD_TOKEN_PATTERN = re.compile(r"(?=\S)(?:\S*[^\s{0}])?([{0}]*)".format(PUNC_CHARS))
+
+
+class PendingResult(object):
+    """
+    Chunking submitted with `segment_async` or `segment_page_async`, `get()`
+    waits for and returns its result and `cancel()` stops it
+    """
+
+    def __init__(self, get, cancel=None):
+
+        self.get = get
+        self.cancel = cancel or (lambda: None)
+
+
+def result_size(result):
+    size = sys.getsizeof(result)
+    for chunk in result:
+        size += sys.getsizeof(chunk)
+        if isinstance(chunk, Chunk):
+            size += sys.getsizeof(chunk.text)
+    return size
 
 
 class Chunker(object):
+    # Initial estimate of the seconds the language model chunker spends per
+    # word and span length, refined from measured runs
+    SPAN_SECONDS = 2e-6
+    # Words the language model chunker scores at once
+    SPAN_BLOCK = 64
+
     def __init__(
         self,
         language_model_path,
         max_words_per_sentence,
         split_by_punctuation,
         max_total_words,
+        span_cache_size=0,
+        result_cache_size=0,
+        result_cache_ttl=None,
+        lm_load_method="populate_or_lazy",
+        lm_window=0,
+        lm_beam=0,
+        max_words_per_sentence_limit=0,
+        max_total_words_limit=0,
     ):
 
-        self.TASHKEEL_TATWEEL_DICT = {
-            ord(x): None
-            for x in set(ar.ARABIC_TATWEEL) | ar.ARABIC_EXTENDED_TASHKEEL
-            if x != " "
-        }
-        self.AR_CHARS = (
-            {" "}
-            | ar.ARABIC_CHARS
-            | set(ar.ARABIC_TATWEEL)
-            | ar.ARABIC_EXTENDED_TASHKEEL
+        self.language_model = load_language_model(
+            language_model_path, lm_load_method
         )
-
-        self.language_model = kenlm.LanguageModel(language_model_path)
         self.max_words = max_words_per_sentence
         self.split_by_punctuation = split_by_punctuation
         self.max_total_words = max_total_words
-        self.puncs = re.escape(
-            "".join(list(ar.ARABIC_PUNC) + ["?", ";", "-", "\n", "@", "#", "$", "="])
+        # Largest parameters of `with_params`, the configured ones for 0.
+        # The cost of chunking a request and the size of span cache rows
+        # grow with them
+        self.max_params = dict(
+            max_words_per_sentence=max_words_per_sentence_limit
+            or max_words_per_sentence,
+            max_total_words=max_total_words_limit or max_total_words,
         )
+        for name, value in (
+            ("max_words_per_sentence", max_words_per_sentence),
+            ("max_total_words", max_total_words),
+        ):
+            if value > self.max_params[name]:
+                raise ValueError("{} is above its limit".format(name))
+        # Bounds of the language model chunker, 0 for none
+        self.lm_window = lm_window
+        self.lm_beam = lm_beam
+        # Span scores shared by all requests
+        self.span_cache = LRUCache(span_cache_size)
+        # Whole results, weighed in bytes
+        self.result_cache = LRUCache(
+            result_cache_size, weigh=result_size, ttl=result_cache_ttl
+        )
+        # Shared with the chunkers of `with_params`, as a one item array
+        self.span_seconds = array("d", [self.SPAN_SECONDS])
+        if split_by_punctuation:
+            self.token_pattern = PUNC_TOKEN_PATTERN
+        else:
+            self.token_pattern = WORD_TOKEN_PATTERN
 
+    def with_params(
+        self,
+        max_words_per_sentence=None,
+        split_by_punctuation=None,
+        max_total_words=None,
+    ):
+        """
+        Chunker of the given parameters instead of the ones of this chunker,
+        `None` keeps them. It shares the language model and the caches of
+        this chunker, so making one per request only costs a shallow copy.
 
-    def score(self, words):
-        # Join words
-        text = " ".join(words)
+        Raises `InvalidRequest` when a parameter is out of range, word counts
+        can't exceed the limits the chunker was created with
+        """
+        for name, value in (
+            ("max_words_per_sentence", max_words_per_sentence),
+            ("max_total_words", max_total_words),
+        ):
+            if value is None:
+                continue
+            if value < 1:
+                raise InvalidRequest("{} must be positive".format(name))
+            if value > self.max_params[name]:
+                raise InvalidRequest(
+                    "{} must be at most {}".format(name, self.max_params[name])
+                )
+        params = (max_words_per_sentence, split_by_punctuation, max_total_words)
+        if params == (None, None, None):
+            return self
+
+        chunker = copy.copy(self)
+        if max_words_per_sentence is not None:
+            chunker.max_words = max_words_per_sentence
+        if split_by_punctuation is not None:
+            chunker.split_by_punctuation = split_by_punctuation
+            if split_by_punctuation:
+                chunker.token_pattern = PUNC_TOKEN_PATTERN
+            else:
+                chunker.token_pattern = WORD_TOKEN_PATTERN
+        if max_total_words is not None:
+            chunker.max_total_words = max_total_words
+        return chunker
+
+    def __normalize(self, text):
         # Normalize encoding
         normalized = ar.normalize_encoding(text, normalize_combined=True)
-        # Remove Tashkeel and Tatweel
-        normalized = normalized.translate(self.TASHKEEL_TATWEEL_DICT)
-        # Keep only Arabic characters
-        normalized = re.sub(
-            " +",
-            " ",
-            "".join([ch if ch in self.AR_CHARS else " " for ch in normalized]),
+        # Remove Tashkeel and Tatweel and keep only Arabic characters
+        normalized = TASHKEEL_TATWEEL_PATTERN.sub("", normalized)
+        normalized = NON_AR_PATTERN.sub(" ", normalized)
+        # Remove multiple whitespaces
+        return SPACES_PATTERN.sub(" ", normalized)
+
+    @property
+    def params(self):
+        """
+        parameters changing the chunks of a text, part of result cache keys
+        """
+        return (
+            self.max_words,
+            self.split_by_punctuation,
+            self.max_total_words,
+            self.lm_window,
+            self.lm_beam,
         )
+
+    def normalize_words(self, words, memo=None):
+        """
+        Normalize `words` once into a flat list of language model tokens.
+
+        A word can normalize to several tokens or to none at all, the tokens
+        of `words[i]` are `tokens[bounds[i]: bounds[i + 1]]` and its
+        normalized form is `words[i]`. `memo` maps words to their normalized
+        form and tokens and can be shared between calls so repeated words are
+        only normalized once
+        """
+        if memo is None:
+            memo = {}
+        tokens = []
+        bounds = array("I", [0])
+        normalized_words = []
+        for word in words:
+            normalized = memo.get(word)
+            if normalized is None:
+                word_tokens = tuple(self.__normalize(word).split())
+                normalized = memo[word] = (" ".join(word_tokens), word_tokens)
+            normalized_words.append(normalized[0])
+            tokens.extend(normalized[1])
+            bounds.append(len(tokens))
+        return NormalizedWords(tokens, bounds, normalized_words)
+
+    def score(self, words):
+        # Normalize words
+        normalized = self.normalize_words(words)
         # Return language model score
-        score = self.language_model.score(normalized)
+        score = self.language_model.score(" ".join(normalized.tokens))
         return score
 
-    def __lm_chunk_utterance(self, text):
+    def lm_seconds(self, n_words):
+        """
+        projected seconds to chunk `n_words` words with the language model
+        """
+        return n_words * self.max_words * self.span_seconds[0]
+
+    def __span_scores(self, normalized, deadline=None, stop=None):
+        """
+        Score every span of at most `max_words` words starting at each word
+        before `stop`.
+
+        The language model state is walked forward from the beginning of
+        sentence, so extending a span by one word costs a single n-gram
+        lookup (plus the end of sentence lookup) instead of rescoring the
+        whole span. `spans[i][j]` equals `self.score(words[i: i + j + 1])`.
+
+        The scores of the spans starting at a word only depend on the next
+        `max_words` normalized words, so they are cached under those words
+        and reused by any request repeating them
+        """
+        tokens, bounds, words = normalized
+        lm = self.language_model
+        if deadline is None:
+            deadline = Deadline()
+        spans = []
+        hits = 0
+        lm_calls = 0
+        for start in range(len(words) if stop is None else stop):
+            deadline.check()
+            key = tuple(words[start: start + self.max_words])
+            row = self.span_cache.get(key)
+            if row is not None:
+                spans.append(row)
+                hits += 1
+                continue
+            state, out_state = kenlm.State(), kenlm.State()
+            lm.BeginSentenceWrite(state)
+            # kenlm sums sentence scores in single precision, so do the same
+            # to get exactly what `score` returns
+            total = array("f", [0.0])
+            row = array("f")
+            position = bounds[start]
+            for end in bounds[start + 1: start + self.max_words + 1]:
+                while position < end:
+                    total[0] += lm.BaseScore(state, tokens[position], out_state)
+                    state, out_state = out_state, state
+                    position += 1
+                row.append(total[0] + lm.BaseScore(state, "</s>", out_state))
+            lm_calls += position - bounds[start] + len(row)
+            self.span_cache.put(key, row)
+            spans.append(row)
+
+        stats = deadline.stats
+        stats.lm_calls += lm_calls
+        if self.span_cache.capacity > 0:
+            stats.cache_hits["span"] += hits
+            stats.cache_misses["span"] += len(spans) - hits
+        return spans
+
+    def __lm_chunk_utterance(self, words, memo=None, deadline=None):
         """
         Implementation for a dynamic programming chunker based on a language model
-        to chunk while maximizing the sum of chunks scores
+        to chunk while maximizing the sum of chunks scores.
+
+        Words are processed left to right and chunks are yielded as soon as
+        every split point that can still start a chunk traces back to them,
+        so the output is exact and incremental and only the undecided words
+        are kept. If they are still undecided after `lm_window` words, the
+        chunks of the best segmentation so far are committed to bound
+        memory. With `lm_beam`, only that many best split points are kept
+        at every word besides the word itself
         """
-        words = text.split()
         # If text is already short enough, do not split
         if len(words) <= self.max_words:
-            chunks = words
-        else:
-            # Create dynamic programming arrays
-            optimal = [float("-inf")] * len(words)
-            track = [-1] * len(words)
-            # Initialize base cases
-            for j in range(self.max_words):
-                if j >= len(words):
-                    break
-                optimal[j] = self.score(words[: j + 1])
-            # Find optimal solution
-            for i in range(len(words)):
-                for j in range(1, self.max_words + 1):
-                    if i + j >= len(words):
-                        break
-                    new_optimal = optimal[i] + self.score(words[i + 1: i + j + 1])
-                    if optimal[i + j] < new_optimal:
-                        optimal[i + j] = new_optimal
-                        track[i + j] = i
-            # Track optimal solution path
-            solution = [len(words)]
-            prev_track = track[-1]
-            while prev_track != -1:
-                solution.append(prev_track)
-                prev_track = track[prev_track]
-            chunks = []
-            idx = 0
-            for i in reversed(solution):
-                chunks.append(words[idx: i + 1])
-                idx = i + 1
-        return chunks
+            yield from words
+            return
+        if deadline is None:
+            deadline = Deadline()
+        stats = deadline.stats
+
+        # `optimal[i]` is the best score of chunking `words[: i + 1]` and
+        # `track[i]` the last word of the previous chunk, -1 for none
+        optimal = {-1: 0.0}
+        track = {}
+        # Split points that can still end the chunk before a new word
+        live = [-1]
+        # Split points some live split point traces back to, and the ones
+        # tracing back to each of them. They form a tree rooted at the last
+        # word yielded, where the live split points are
+        children = {-1: set()}
+        spans = {}
+        # Last word yielded
+        committed = -1
+        # Searching time is counted from here, besides scoring and yielding
+        resumed = time.perf_counter()
+
+        def path(end):
+            # Last words of the chunks up to `end`, after `committed`
+            ends = []
+            while end > committed:
+                ends.append(end)
+                end = track[end]
+            return ends[::-1]
+
+        def traces_back(i, point):
+            # Whether the path to `i` goes through `point`, in at most
+            # `max_words` steps when `point` is a live split point
+            while i > point:
+                i = track[i]
+            return i == point
+
+        def prune(i, live):
+            # Forget `i` and its ancestors once no live split point traces
+            # back to them, each split point is pruned at most once
+            while i > committed and i not in live and not children[i]:
+                del children[i]
+                children[track[i]].discard(i)
+                i = track[i]
+
+        def commit(end):
+            nonlocal resumed
+            # States only grow until chunks are committed
+            stats.dp_states = max(stats.dp_states, len(optimal))
+            start = committed + 1
+            for last in path(end):
+                stats.add("lm_search", time.perf_counter() - resumed)
+                yield words[start: last + 1]
+                resumed = time.perf_counter()
+                start = last + 1
+            for i in range(committed, end):
+                optimal.pop(i, None)
+                track.pop(i, None)
+                children.pop(i, None)
+
+        for t in range(len(words)):
+            if t not in spans:
+                # Score the spans of the next block of words at once
+                started = time.perf_counter()
+                stop = min(t + self.SPAN_BLOCK, len(words)) - t
+                normalized = self.normalize_words(
+                    words[t: t + stop + self.max_words - 1], memo
+                )
+                normalized_at = time.perf_counter()
+                rows = self.__span_scores(normalized, deadline, stop)
+                scored_at = time.perf_counter()
+                spans.update(zip(range(t, t + stop), rows))
+                stats.add("normalize", normalized_at - started)
+                stats.add("lm_scoring", scored_at - normalized_at)
+                resumed += scored_at - started
+                # Refine the cost estimate, slowly so one slow run does not
+                # degrade every following request
+                measured = (scored_at - started) / (stop * self.max_words)
+                self.span_seconds[0] = 0.9 * self.span_seconds[0] + 0.1 * measured
+
+            # Best split point to end the chunk before word `t`, the first
+            # one wins ties
+            scores = {}
+            for i in live:
+                scores[i] = optimal[i] + spans[i + 1][t - i - 1]
+                if t not in optimal or optimal[t] < scores[i]:
+                    optimal[t] = scores[i]
+                    track[t] = i
+            spans.pop(t - self.max_words + 1, None)
+
+            # Chunks have at most `max_words` words
+            dropped = live
+            live = [i for i in live if t + 1 - i <= self.max_words]
+            if self.lm_beam and len(live) > self.lm_beam:
+                live = sorted(sorted(live, key=scores.get)[-self.lm_beam:])
+            live.append(t)
+            children[t] = set()
+            children[track[t]].add(t)
+            kept = set(live)
+            for i in dropped:
+                prune(i, kept)
+
+            # The latest split point all live split points trace back to,
+            # found walking down from the last word yielded while there is a
+            # single way down
+            converged = committed
+            while converged not in kept and len(children[converged]) == 1:
+                (converged,) = children[converged]
+            undecided = t - committed
+            if converged <= committed and 0 < self.lm_window <= undecided:
+                # Give up on exactness, keep the best segmentation so far
+                converged = track[t]
+                dropped = live
+                live = [i for i in live if traces_back(i, converged)]
+                kept = set(live)
+                for i in dropped:
+                    prune(i, kept)
+            if converged > committed:
+                yield from commit(converged)
+                committed = converged
+
+        yield from commit(len(words) - 1)
+
+    def tokenize(self, text, start=0):
+        """
+        `Token`s of `text` from character `start` in a single pass, their
+        offsets are in the whole `text`
+        """
+        for match in self.token_pattern.finditer(text, start):
+            yield Token(match.group(), match.group(1), match.start())
 
     def __is_last_punc(self, sentence):
-        return (
-            len(sentence) > 0
-            and len(sentence[-1]) > 0
-            and sentence[-1][-1] in ar.ARABIC_PUNC
-        )
+        return len(sentence) > 0 and bool(sentence[-1].punc)
 
-    def run(self, text, segmenter_type):
-        chunks = []
-        # Split text by punctuation
-        chunk = ""
-        if self.split_by_punctuation:
-            for ch in text:
-                chunk += ch
-                if ch in ar.ARABIC_PUNC:
-                    chunks.append(chunk.strip())
-                    chunk = ""
-            if len(chunk) > 0:
-                chunks.append(chunk)
-        else:
-            chunks = [text]
+    def __iter_pieces(self, tokens, whole):
+        # Tokens up to every punctuation, or all of them. Pieces are only
+        # `whole` if they have to, otherwise they are cut in blocks so long
+        # texts are not tokenized past the words in use
+        if not self.split_by_punctuation:
+            if whole:
+                yield list(tokens)
+                return
+            piece = list(islice(tokens, self.SPAN_BLOCK))
+            while piece:
+                yield piece
+                piece = list(islice(tokens, self.SPAN_BLOCK))
+            return
+        piece = []
+        for token in tokens:
+            piece.append(token)
+            if token.punc:
+                yield piece
+                piece = []
+        if piece:
+            yield piece
 
-        # Chunk depending on the segmenter type
-        new_chunks = []
-        for chunk in chunks:
-            if segmenter_type == "lm" and len(chunk.split()) > self.max_words:
-                new_chunks.extend(self.__lm_chunk_utterance(chunk))
-            else:
-                new_chunks.extend([[w] for w in chunk.split()])
-        chunks = new_chunks
+    def __iter_word_chunks(self, tokens, segmenter_type, memo, deadline, remaining):
+        # Chunk every piece of text depending on the segmenter type, along
+        # with whether every word of the chunk is a chunk of its own.
+        # `remaining()` is the number of words still taken, `None` for all
+        for piece in self.__iter_pieces(tokens, segmenter_type == "lm"):
+            deadline.check()
+            deadline.stats.words += len(piece)
+            if segmenter_type == "lm" and len(piece) > self.max_words:
+                # Only the words taken and the chunk crossing the last of
+                # them are chunked, whatever the length of the piece
+                n_words = len(piece)
+                if remaining() is not None:
+                    n_words = min(n_words, remaining() + self.max_words)
+                if deadline.affords(self.lm_seconds(n_words)):
+                    words = [token.word for token in piece]
+                    position = 0
+                    for chunk in self.__lm_chunk_utterance(words, memo, deadline):
+                        yield piece[position: position + len(chunk)], False
+                        position += len(chunk)
+                    continue
+                # Not enough time left, fall back to word counts
+                deadline.strategy = "max"
+            yield piece, True
+
+    def __finish_sentence(self, tokens):
+        # Skip of empty sentence
+        if not tokens:
+            return None
+        # Skip if the whole sentence is punctuation, spaces between words
+        # are not
+        if len(tokens) == 1 and len(tokens[0].punc) == len(tokens[0].word):
+            return None
+
+        sentence = " ".join(token.word for token in tokens)
+        # If not splitting by punctuation,
+        # remove muliple punctuations (keep first one)
+        if not self.split_by_punctuation:
+            # Replace sequence of puncs with the first punc
+            sentence = REPEATED_PUNCS_PATTERN.sub(r" \1 ", sentence)
+            # Remove multiple whitespaces
+            sentence = SPACES_PATTERN.sub(" ", sentence)
+
+        return sentence or None
+
+    def __iter_sentences(
+        self, tokens, segmenter_type, memo, deadline, max_total_words
+    ):
+        # `Chunk`s of sentences of `tokens`, up to `max_total_words` words
+        # unless it is `None`
+        if memo is None:
+            memo = {}
+        if deadline is None:
+            deadline = Deadline()
 
         # Merge consecutive sentences if too short
-        sentences = []
         sentence = []
         total_words = 0
-        for chunk in chunks:
-            # If reached max total words, break
-            if total_words + len(chunk) > self.max_total_words:
-                break
-            total_words += len(chunk)
-
-            # If adding this chunk exceeds max sentence length
-            # or the sentence has punctuation at the end
-            # then start a new sentence
-            if len(sentence) + len(chunk) > self.max_words or (
-                self.split_by_punctuation and self.__is_last_punc(sentence)
-            ):
-                sentences.append(sentence)
-                sentence = []
-            # Add chunk to the current sentence
-            sentence += chunk
 
-        # Add last sentence if not empty
-        if total_words <= self.max_total_words and len(sentence) > 0:
-            sentences.append(sentence)
-
-        all_chunks = []
-        for words in sentences:
-            sentence = " ".join(words)
-            # Skip of empty sentence
-            if not sentence:
-                continue
-            # Skip if the whole sentence is punctuation
-            is_all_punc = True
-            for ch in sentence:
-                if ch not in ar.ARABIC_PUNC:
-                    is_all_punc = False
-                    break
-            if is_all_punc:
+        def remaining():
+            if max_total_words is None:
+                return None
+            return max_total_words - total_words
+
+        chunks = self.__iter_word_chunks(
+            tokens, segmenter_type, memo, deadline, remaining
+        )
+        for words, per_word in chunks:
+            position = 0
+            while position < len(words):
+                if per_word:
+                    # Take as many one word chunks as would be added one by
+                    # one to the same sentence
+                    room = self.max_words - len(sentence)
+                    if room <= 0 or (
+                        self.split_by_punctuation and self.__is_last_punc(sentence)
+                    ):
+                        room = self.max_words
+                    if max_total_words is not None:
+                        room = min(room, max(max_total_words - total_words, 1))
+                    chunk = words[position: position + room]
+                else:
+                    chunk = words
+                position += len(chunk)
+
+                # If reached max total words, break
+                if max_total_words is not None:
+                    if total_words + len(chunk) > max_total_words:
+                        break
+                    total_words += len(chunk)
+
+                # If adding this chunk exceeds max sentence length
+                # or the sentence has punctuation at the end
+                # then start a new sentence
+                if len(sentence) + len(chunk) > self.max_words or (
+                    self.split_by_punctuation and self.__is_last_punc(sentence)
+                ):
+                    finished = self.__finish_sentence(sentence)
+                    if finished:
+                        yield self.__chunk(finished, sentence)
+                    sentence = []
+                # Add chunk to the current sentence
+                sentence += chunk
+            else:
                 continue
+            break
+
+        # Add last sentence if not empty
+        if len(sentence) > 0:
+            finished = self.__finish_sentence(sentence)
+            if finished:
+                yield self.__chunk(finished, sentence)
+
+    def __chunk(self, sentence, tokens):
+        last = tokens[-1]
+        return Chunk(sentence, tokens[0].offset, last.offset + len(last.word))
+
+    def iter_run(
+        self,
+        text,
+        segmenter_type,
+        memo=None,
+        deadline=None,
+        long_document=False,
+        with_offsets=False,
+    ):
+        """
+        Same as `run` but yields every chunk as soon as it is final, that is
+        once the next sentence has started. Chunks stop after
+        `max_total_words` words unless `long_document` is set, and are
+        `Chunk`s with their offsets in `text` when `with_offsets` is set
+        """
+        max_total_words = None if long_document else self.max_total_words
+        chunks = self.__iter_sentences(
+            self.tokenize(text), segmenter_type, memo, deadline, max_total_words
+        )
+        if with_offsets:
+            yield from chunks
+        else:
+            for chunk in chunks:
+                yield chunk.text
+
+    def run(self, text, segmenter_type, memo=None, deadline=None):
+        return list(self.iter_run(text, segmenter_type, memo, deadline))
+
+    def segment_page(
+        self,
+        text,
+        offset=0,
+        segmenter_type="lm",
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        Chunk the page of `text` starting at character `offset`, a page being
+        as many chunks as fit in `max_total_words` words. Returns the chunks,
+        `Chunk`s with their offsets in `text` when `with_offsets` is set, and
+        the offset of the next page, 0 after the last page.
+
+        Only the page and the `max_words + lm_window` words after it are
+        tokenized and chunked, so a page costs the same anywhere in a
+        document of any length, and a whole document goes through in pages
+        without ever holding more than a page of it. Pages are chunked the
+        same as the whole text unless `lm_window` forced a chunk or the
+        language model chunker needs more words than that to settle on them.
+
+        Raises `InvalidRequest` when `offset` is out of `text`
+        """
+        if not 0 <= offset <= len(text):
+            raise InvalidRequest("offset is out of the text")
+        if deadline is None:
+            deadline = Deadline()
+        deadline.strategy = segmenter_type
+
+        tokens = self.tokenize(text, offset)
+        # Chunks have at most `max_words` words and the language model
+        # chunker settles on them within `lm_window` more words, unless
+        # it needs the rest of the text
+        lookahead = self.max_total_words + self.max_words + self.lm_window
+        chunks = []
+        total_words = 0
+        next_offset = 0
+        for chunk in self.__iter_sentences(
+            islice(tokens, lookahead), segmenter_type, memo, deadline, None
+        ):
+            n_words = len(chunk.text.split())
+            if chunks and total_words + n_words > self.max_total_words:
+                next_offset = chunk.start
+                break
+            total_words += n_words
+            chunks.append(chunk)
+        else:
+            following = next(tokens, None)
+            if following is not None:
+                # Words left out of chunks, like repeated punctuation, kept
+                # the page from filling up, its last chunk may be cut short
+                next_offset = following.offset
+                if len(chunks) > 1:
+                    next_offset = chunks.pop().start
+
+        if not with_offsets:
+            chunks = [chunk.text for chunk in chunks]
+        return chunks, next_offset
 
-            # If not splitting by punctuation,
-            # remove muliple punctuations (keep first one)
-            if not self.split_by_punctuation:
-                # Replace sequence of puncs with the first punc
-                sentence = re.sub(
-                    r"([%s])[%s]+" % (self.puncs, self.puncs + " "), r" \1 ", sentence
+    def segment_page_async(
+        self,
+        text,
+        offset=0,
+        segmenter_type="lm",
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        `segment_page` as a `PendingResult`, the page is chunked in the
+        calling process once its result is asked for
+        """
+        return PendingResult(
+            lambda: self.segment_page(
+                text, offset, segmenter_type, memo, deadline, with_offsets
+            )
+        )
+
+    def __iter_ssml(self, text, segmenter_type, memo, deadline, long_document):
+        with deadline.stats.timing("ssml"):
+            sentences = split_ssml(text)
+        for sentence in sentences:
+            sentence = sentence.strip()
+            length = sentence_length(sentence)
+
+            if length > self.max_words:
+                yield from self.iter_run(
+                    text=sentence,
+                    segmenter_type=segmenter_type,
+                    memo=memo,
+                    deadline=deadline,
+                    long_document=long_document,
                 )
-                # Remove multiple whitespaces
-                sentence = re.sub(" +", " ", sentence)
 
-            if sentence:
-                all_chunks.append(sentence)
+            elif sentence:
+                deadline.stats.words += length
+                yield sentence
 
-        return all_chunks
+    def iter_segment(
+        self,
+        text,
+        segmenter_type="lm",
+        parse_ssml=False,
+        memo=None,
+        deadline=None,
+        long_document=False,
+        with_offsets=False,
+    ):
+        """
+        Chunk `text`, or each sentence of `text` when it is SSML, yielding
+        every chunk as soon as it is final. Repeated requests are answered
+        from the result cache without validating, splitting or scoring
+        anything. `memo` of normalized words can be shared by several calls,
+        see `normalize_words`.
+
+        A `long_document` is chunked whole instead of stopping after
+        `max_total_words` words, and its chunks are neither kept nor cached.
+        With `with_offsets`, chunks are `Chunk`s with their offsets in `text`.
+
+        Parts of the text the language model can't chunk within the time
+        budget of `deadline` are chunked by word counts instead, and
+        `deadline.strategy` tells which segmenter was used.
+
+        Raises `InvalidSSML` when `parse_ssml` is set and `text` is invalid,
+        `InvalidRequest` when offsets of SSML are asked for and `Cancelled`
+        once `deadline` is cancelled
+        """
+        if deadline is None:
+            deadline = Deadline()
+        deadline.strategy = segmenter_type
+
+        if memo is None:
+            memo = {}
+        if parse_ssml and with_offsets:
+            raise InvalidRequest("offsets are only given for plain text")
+        if parse_ssml:
+            chunks = self.__iter_ssml(
+                text, segmenter_type, memo, deadline, long_document
+            )
+        else:
+            chunks = self.iter_run(
+                text, segmenter_type, memo, deadline, long_document, with_offsets
+            )
+
+        if long_document:
+            yield from chunks
+            return
+
+        key = digest(text, segmenter_type, parse_ssml, with_offsets, *self.params)
+        result = deadline.stats.lookup("result", self.result_cache, key)
+        if result is not None:
+            yield from result
+            return
+
+        result = []
+        for chunk in chunks:
+            result.append(chunk)
+            yield chunk
+        # Only complete results of the requested segmenter are cached
+        if deadline.strategy == segmenter_type:
+            self.result_cache.put(key, tuple(result))
+
+    def segment(
+        self,
+        text,
+        segmenter_type="lm",
+        parse_ssml=False,
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        Chunk `text` all at once, see `iter_segment`
+        """
+        return list(
+            self.iter_segment(
+                text,
+                segmenter_type,
+                parse_ssml,
+                memo,
+                deadline,
+                with_offsets=with_offsets,
+            )
+        )
+
+    def segment_async(
+        self,
+        text,
+        segmenter_type="lm",
+        parse_ssml=False,
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        `segment` as a `PendingResult`, the text is chunked in the calling
+        process once its result is asked for
+        """
+        return PendingResult(
+            lambda: self.segment(
+                text, segmenter_type, parse_ssml, memo, deadline, with_offsets
+            )
+        )
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from utterance_segmentation.metrics import RequestStats
+
+
+class Cancelled(Exception):
+    """
+    the request was cancelled, nobody is waiting for its chunks
+    """
+
+
+class Deadline(object):
+    """
+    Time budget of a request, `None` seconds for no budget, and whether the
+    request was cancelled.
+
+    Chunkers record in `strategy` the segmenter they ended up using, which
+    is cheaper than the requested one when the budget did not allow the
+    requested one, and in `stats` what chunking took.
+
+    `cancelled` is the event cancelling the request, anything with the
+    `is_set` and `set` of a `threading.Event`, a new event by default
+    """
+
+    def __init__(self, seconds=None, cancelled=None):
+
+        self.expires = None if seconds is None else time.monotonic() + seconds
+        self.strategy = None
+        self.stats = RequestStats()
+        if cancelled is None:
+            cancelled = threading.Event()
+        self._cancelled = cancelled
+
+    def remaining(self):
+        if self.expires is None:
+            return None
+        return self.expires - time.monotonic()
+
+    def affords(self, seconds):
+        remaining = self.remaining()
+        return remaining is None or seconds <= remaining
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        """
+        Raises `Cancelled` once the request is cancelled
+        """
+        if self._cancelled.is_set():
+            raise Cancelled()
@@ -0,0 +1,171 @@
+from traceback import print_exc
+
+from flask import g
+from micro_service import MicroService, Param, ParamSources, get_blueprint
+
+from config import config
+from utterance_segmentation.deadline import Deadline
+from utterance_segmentation.metrics import CONTENT_TYPE, METRICS
+from utterance_segmentation.profiler import profile_on_signal
+from utterance_segmentation.registry import (
+    ModelLoading,
+    create_registry,
+    reload_on_signal,
+)
+from utterance_segmentation.utils import InvalidRequest
+
+blueprint = get_blueprint()
+models = None
+
+
+def chunker_service(run=False, **kwargs):
+
+    params = config
+    params.update(kwargs)
+    chunker_micro_service = MicroService(__name__, **params)
+    chunker_micro_service.register_blueprint(blueprint)
+
+    # get config of ms
+    ms_config = chunker_micro_service.config
+
+    # initalize chunker
+    global models
+    models = create_registry(ms_config)
+    models.warm_up(prefault_file=ms_config["lm_prefault"])
+    reload_on_signal(models)
+    profile_on_signal(ms_config["profile_dir"], ms_config["profile_seconds"])
+
+    if run:
+        chunker_micro_service.run_service()
+    else:
+        return chunker_micro_service
+
+
+@blueprint.route(
+    "/chunker",
+    methods=["GET", "POST"],
+    params=[
+        Param(
+            name="text",
+            type=str,
+            required=True,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        Param(
+            name="segmenter_type",
+            type=str,
+            default="lm",
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        Param(
+            name="parse_ssml",
+            type=bool,
+            default=False,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        Param(
+            name="long_document",
+            type=bool,
+            default=False,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        # offsets, of the page and of the chunks, count Unicode code points,
+        # not UTF-16 code units or UTF-8 bytes
+        Param(
+            name="offset",
+            type=int,
+            default=0,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        Param(
+            name="with_offsets",
+            type=bool,
+            default=False,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        Param(
+            name="model",
+            type=str,
+            default="",
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        # chunker parameters of this request, the configured ones by default,
+        # word counts can't exceed the configured `*_limit` ones
+        Param(
+            name="max_words_per_sentence",
+            type=int,
+            default=None,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        Param(
+            name="split_by_punctuation",
+            type=bool,
+            default=None,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+        Param(
+            name="max_total_words",
+            type=int,
+            default=None,
+            source=[ParamSources.ARGS, ParamSources.BODY_JSON],
+        ),
+    ],
+)
+def chunker_endpoint():
+
+    cfg = g.config
+    p = g.params
+    deadline = Deadline()
+
+    try:
+        with METRICS.request("http", "chunker", deadline):
+            chunker = models.get(p["model"]).with_params(
+                p["max_words_per_sentence"],
+                p["split_by_punctuation"],
+                p["max_total_words"],
+            )
+            if p["long_document"]:
+                if p["parse_ssml"]:
+                    raise InvalidRequest("long SSML documents can only be streamed")
+                results, next_offset = chunker.segment_page(
+                    text=p["text"],
+                    offset=p["offset"],
+                    segmenter_type=p["segmenter_type"],
+                    deadline=deadline,
+                    with_offsets=p["with_offsets"],
+                )
+                response = {"next_offset": next_offset}
+            else:
+                results = chunker.segment(
+                    text=p["text"],
+                    segmenter_type=p["segmenter_type"],
+                    parse_ssml=p["parse_ssml"],
+                    deadline=deadline,
+                    with_offsets=p["with_offsets"],
+                )
+                response = {}
+
+        response["status"] = "SUCCESS"
+        if p["with_offsets"]:
+            response["results"] = [chunk.text for chunk in results]
+            response["offsets"] = [[chunk.start, chunk.end] for chunk in results]
+        else:
+            response["results"] = results
+
+        return response, 200, cfg["headers"]
+
+    except InvalidRequest as exception:
+        return str(exception), 400
+
+    except ModelLoading as exception:
+        return str(exception), 503
+
+    except Exception as exception:
+        print_exc()
+        return "FAIL", 500, cfg["headers"]
+
+
+@blueprint.route("/metrics", methods=["GET"], params=[])
+def metrics_endpoint():
+
+    return METRICS.render(models), 200, {"Content-Type": CONTENT_TYPE}
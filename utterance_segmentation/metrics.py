@@ -0,0 +1,263 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Content type of `Metrics.render`
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+COUNT_BUCKETS = (10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+
+# Stages of chunking, they don't overlap
+STAGES = ("ssml", "normalize", "lm_scoring", "lm_search")
+CACHES = ("span", "result")
+
+
+class RequestStats(object):
+    """
+    What chunking a request took, recorded by chunkers in the `stats` of its
+    `Deadline` and observed by `Metrics` once the request is done. Cheap
+    enough to record on every request, and picklable so worker processes
+    send it back along with their chunks
+    """
+
+    def __init__(self):
+
+        # Seconds spent in each of `STAGES`
+        self.stages = {}
+        # Language model lookups, peak states of the language model chunker
+        # and words chunked
+        self.lm_calls = 0
+        self.dp_states = 0
+        self.words = 0
+        self.cache_hits = dict.fromkeys(CACHES, 0)
+        self.cache_misses = dict.fromkeys(CACHES, 0)
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def lookup(self, cache, lru_cache, key):
+        """
+        `lru_cache.get(key)`, counted as a hit or a miss of `cache` when
+        caching is enabled
+        """
+        value = lru_cache.get(key)
+        if lru_cache.capacity > 0:
+            if value is None:
+                self.cache_misses[cache] += 1
+            else:
+                self.cache_hits[cache] += 1
+        return value
+
+    @contextmanager
+    def timing(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def merge(self, other):
+        """
+        Add the stats `other` recorded, in a worker process, to these
+        """
+        for stage, seconds in other.stages.items():
+            self.add(stage, seconds)
+        self.lm_calls += other.lm_calls
+        self.dp_states = max(self.dp_states, other.dp_states)
+        self.words += other.words
+        for cache in CACHES:
+            self.cache_hits[cache] += other.cache_hits[cache]
+            self.cache_misses[cache] += other.cache_misses[cache]
+
+
+class Histogram(object):
+    """
+    Thread-safe histogram of values by label values, rendered as a
+    Prometheus histogram
+    """
+
+    def __init__(self, name, help, buckets, labels=()):
+
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # label values -> ([count per bucket, the last one for +Inf], sum)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(label_values)
+            if values is None:
+                values = self._values[label_values] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                ]
+            values[0][bucket] += 1
+            values[1] += value
+
+    def count(self, *label_values):
+        with self._lock:
+            values = self._values.get(label_values)
+            return 0 if values is None else sum(values[0])
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        with self._lock:
+            values = sorted(
+                (label_values, list(counts), total)
+                for label_values, (counts, total) in self._values.items()
+            )
+        for label_values, counts, total in values:
+            labels = [
+                '{}="{}"'.format(label, value)
+                for label, value in zip(self.labels, label_values)
+            ]
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                bucket_labels = ",".join(labels + ['le="{}"'.format(bound)])
+                lines.append(
+                    "{}_bucket{{{}}} {}".format(self.name, bucket_labels, cumulative)
+                )
+            suffix = "{{{}}}".format(",".join(labels)) if labels else ""
+            lines.append("{}_sum{} {}".format(self.name, suffix, total))
+            lines.append("{}_count{} {}".format(self.name, suffix, cumulative))
+        return lines
+
+
+def render_counter(name, help, kind, samples):
+    # Lines of a counter or a gauge, `samples` are (labels, value)
+    lines = ["# HELP {} {}".format(name, help), "# TYPE {} {}".format(name, kind)]
+    for labels, value in samples:
+        if labels:
+            labels = "{{{}}}".format(
+                ",".join('{}="{}"'.format(*label) for label in labels)
+            )
+        lines.append("{}{} {}".format(name, labels or "", value))
+    return lines
+
+
+class Metrics(object):
+    """
+    Latency histograms of requests and of the stages of chunking, and counts
+    of what chunking took per request, in the Prometheus text format.
+
+    Request handlers wrap every request in `request`, which observes the
+    `RequestStats` chunkers recorded in its `Deadline`
+    """
+
+    def __init__(self):
+
+        self.request_seconds = Histogram(
+            "chunker_request_seconds",
+            "Seconds to answer a request",
+            SECONDS_BUCKETS,
+            ("transport", "method"),
+        )
+        self.stage_seconds = Histogram(
+            "chunker_stage_seconds",
+            "Seconds spent in a stage of chunking, per request",
+            SECONDS_BUCKETS,
+            ("stage",),
+        )
+        self.lm_calls = Histogram(
+            "chunker_lm_calls",
+            "Language model lookups per request",
+            COUNT_BUCKETS,
+        )
+        self.dp_states = Histogram(
+            "chunker_dp_states",
+            "Peak states of the language model chunker per request",
+            COUNT_BUCKETS,
+        )
+        self.words = Histogram(
+            "chunker_input_words", "Words chunked per request", COUNT_BUCKETS
+        )
+        self.cache_hits = dict.fromkeys(CACHES, 0)
+        self.cache_misses = dict.fromkeys(CACHES, 0)
+        self._lock = threading.Lock()
+
+    def observe(self, transport, method, seconds, stats):
+        self.request_seconds.observe(seconds, transport, method)
+        for stage, stage_seconds in stats.stages.items():
+            self.stage_seconds.observe(stage_seconds, stage)
+        # Requests answered from the result cache don't chunk anything
+        if stats.words:
+            self.lm_calls.observe(stats.lm_calls)
+            self.dp_states.observe(stats.dp_states)
+            self.words.observe(stats.words)
+        with self._lock:
+            for cache in CACHES:
+                self.cache_hits[cache] += stats.cache_hits[cache]
+                self.cache_misses[cache] += stats.cache_misses[cache]
+
+    @contextmanager
+    def request(self, transport, method, deadline):
+        """
+        Observe the request `deadline` is the budget of, whether it succeeds
+        or not
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                transport, method, time.perf_counter() - started, deadline.stats
+            )
+
+    def render(self, models=None):
+        """
+        Metrics in the Prometheus text format, along with the stats of the
+        `ModelRegistry` `models` if given
+        """
+        lines = []
+        for histogram in (
+            self.request_seconds,
+            self.stage_seconds,
+            self.lm_calls,
+            self.dp_states,
+            self.words,
+        ):
+            lines += histogram.render()
+        with self._lock:
+            hits = sorted(self.cache_hits.items())
+            misses = sorted(self.cache_misses.items())
+        lines += render_counter(
+            "chunker_cache_hits_total",
+            "Cache hits",
+            "counter",
+            [((("cache", cache),), value) for cache, value in hits],
+        )
+        lines += render_counter(
+            "chunker_cache_misses_total",
+            "Cache misses",
+            "counter",
+            [((("cache", cache),), value) for cache, value in misses],
+        )
+        if models is not None:
+            stats = models.stats()
+            for name, metric, kind, help in (
+                ("loaded", "loaded", "gauge", "Language models loaded"),
+                ("weight", "bytes", "gauge", "Bytes of the loaded language models"),
+                ("loads", "loads_total", "counter", "Language model loads"),
+                ("reloads", "reloads_total", "counter", "Language model reloads"),
+                ("evictions", "evictions_total", "counter", "Language models evicted"),
+            ):
+                lines += render_counter(
+                    "chunker_models_" + metric, help, kind, [((), stats[name])]
+                )
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of this process
+METRICS = Metrics()
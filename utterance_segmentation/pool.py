@@ -0,0 +1,525 @@
+import copy
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+
+from utterance_segmentation.cache import LRUCache, digest
+from utterance_segmentation.chunker import Chunker, PendingResult, result_size
+from utterance_segmentation.deadline import Cancelled, Deadline
+
+# Chunker of the pool, loaded once and inherited by the forked workers
+_chunker = None
+# Cancelled requests of the pool, shared with the forked workers, see
+# `CancelFlag`
+_cancels = None
+# Workers of the requests of the pool, shared with the forked workers, see
+# `RequestWorker`
+_workers = None
+
+# Seconds between checks of the deadline while waiting for a worker
+POLL_SECONDS = 0.05
+# Requests that can be cancelled at once in the workers of a pool
+CANCEL_SLOTS = 4096
+
+
+class CancelFlag(object):
+    """
+    Flag cancelling the request numbered `request` in the workers of a pool,
+    with the `is_set` and `set` of a `threading.Event` so it can cancel a
+    `Deadline`.
+
+    `cancels` is an array in memory shared with the workers, the request is
+    cancelled once its slot holds its number. Requests share the slots modulo
+    the size of the array, so a flag never cancels another request, at worst
+    a request cancelled while thousands more were submitted is not stopped
+    """
+
+    def __init__(self, cancels, request):
+
+        self.cancels = cancels
+        self.request = request
+        self.slot = request % len(cancels)
+
+    def is_set(self):
+        return self.cancels[self.slot] == self.request
+
+    def set(self):
+        self.cancels[self.slot] = self.request
+
+
+class RequestWorker(object):
+    """
+    Process of a pool chunking the request numbered `request`, once one took
+    it.
+
+    `workers` is an array in memory shared with the workers, holding the pid
+    and then the number of the last request started at each slot, the slot
+    of a request being the one of its `CancelFlag`
+    """
+
+    def __init__(self, workers, request):
+
+        self.workers = workers
+        self.request = request
+        self.slot = 2 * (request % (len(workers) // 2))
+
+    def start(self):
+        # In the worker, the pid first so it is set once the request is
+        self.workers[self.slot] = os.getpid()
+        self.workers[self.slot + 1] = self.request
+
+    def pid(self):
+        """
+        pid of the process that took the request, `None` until one did
+        """
+        if self.workers[self.slot + 1] != self.request:
+            return None
+        return self.workers[self.slot]
+
+
+class WorkerLost(Exception):
+    """
+    the worker chunking the request died, its result will never come
+    """
+
+
+def _deadline(expires, request):
+    # Deadline of a request in a worker, of the wall clock time it expires at
+    # so the time it waited in the pool counts
+    RequestWorker(_workers, request).start()
+    seconds = None if expires is None else expires - time.time()
+    return Deadline(seconds, CancelFlag(_cancels, request))
+
+
+def _segment(
+    text, segmenter_type, parse_ssml, with_offsets, params, expires, request
+):
+    deadline = _deadline(expires, request)
+    result = _chunker.with_params(**params).segment(
+        text,
+        segmenter_type,
+        parse_ssml,
+        deadline=deadline,
+        with_offsets=with_offsets,
+    )
+    return result, deadline.strategy, deadline.stats
+
+
+def _segment_page(
+    text, offset, segmenter_type, with_offsets, params, expires, request
+):
+    deadline = _deadline(expires, request)
+    result = _chunker.with_params(**params).segment_page(
+        text, offset, segmenter_type, deadline=deadline, with_offsets=with_offsets
+    )
+    return result, deadline.strategy, deadline.stats
+
+
+def _stream(
+    queue,
+    text,
+    segmenter_type,
+    parse_ssml,
+    long_document,
+    with_offsets,
+    params,
+    expires,
+    request,
+):
+    # Chunks are sent as soon as they are final, followed by a plain tuple of
+    # the strategy used and the stats of the request or by the exception that
+    # stopped chunking
+    deadline = _deadline(expires, request)
+    try:
+        for chunk in _chunker.with_params(**params).iter_segment(
+            text,
+            segmenter_type,
+            parse_ssml,
+            deadline=deadline,
+            long_document=long_document,
+            with_offsets=with_offsets,
+        ):
+            queue.put(chunk)
+    except Exception as exception:
+        queue.put(exception)
+    else:
+        queue.put((deadline.strategy, deadline.stats))
+
+
+def _wait(get, deadline, cancel, lost):
+    """
+    `get(timeout=...)` of the result of a worker, waiting no longer than the
+    time budget of `deadline` so a pool too busy to start the task can't
+    block the caller, and no longer than the worker lives so a worker that
+    died can't either, budget or not.
+
+    Raises `Cancelled` once `deadline` is cancelled or expired, like a
+    request nobody waits for anymore, after setting the `CancelFlag`
+    `cancel` so the worker stops chunking too. Raises `WorkerLost` once
+    `lost()` tells the worker died
+    """
+    try:
+        while True:
+            deadline.check()
+            remaining = deadline.remaining()
+            if remaining is None:
+                timeout = POLL_SECONDS
+            else:
+                timeout = min(max(remaining, 0), POLL_SECONDS)
+            try:
+                return get(timeout=timeout)
+            except (multiprocessing.TimeoutError, queue.Empty):
+                if remaining is not None and remaining <= 0:
+                    raise Cancelled()
+            if lost():
+                # The worker may have sent its result right before dying
+                try:
+                    return get(timeout=POLL_SECONDS)
+                except (multiprocessing.TimeoutError, queue.Empty):
+                    raise WorkerLost()
+    except Cancelled:
+        cancel.set()
+        raise
+
+
+class ChunkerPool(object):
+    """
+    Chunks texts in a pool of worker processes so chunking is not serialized
+    by the GIL, with the same `segment` and `iter_segment` interface as
+    `Chunker`.
+
+    The language model is loaded once before forking the workers, so they
+    share its pages instead of loading private copies. Results are cached in
+    the calling process so cache hits never reach a worker. Workers are
+    forked when the pool is created, create it before starting any gRPC
+    server or thread.
+
+    Deadlines behave as with `Chunker`: the time a request waits for a
+    worker counts against its budget, and cancelling it stops its worker.
+    Requests whose worker died raise `WorkerLost` instead of waiting forever
+    """
+
+    def __init__(
+        self,
+        processes,
+        language_model_path,
+        max_words_per_sentence,
+        split_by_punctuation,
+        max_total_words,
+        span_cache_size=0,
+        result_cache_size=0,
+        result_cache_ttl=None,
+        lm_load_method="populate_or_lazy",
+        lm_window=0,
+        lm_beam=0,
+        max_words_per_sentence_limit=0,
+        max_total_words_limit=0,
+    ):
+
+        self.max_words = max_words_per_sentence
+        self.split_by_punctuation = split_by_punctuation
+        self.max_total_words = max_total_words
+        self.lm_window = lm_window
+        self.lm_beam = lm_beam
+        # Parameters of `with_params`, passed along to the workers
+        self.overrides = {}
+        self.result_cache = LRUCache(
+            result_cache_size, weigh=result_size, ttl=result_cache_ttl
+        )
+
+        global _chunker, _cancels, _workers
+        self.chunker = _chunker = Chunker(
+            language_model_path,
+            max_words_per_sentence,
+            split_by_punctuation,
+            max_total_words,
+            span_cache_size=span_cache_size,
+            lm_load_method=lm_load_method,
+            lm_window=lm_window,
+            lm_beam=lm_beam,
+            max_words_per_sentence_limit=max_words_per_sentence_limit,
+            max_total_words_limit=max_total_words_limit,
+        )
+
+        context = multiprocessing.get_context("fork")
+        # Requests are numbered from 1, the slots of cancels start at 0
+        self.requests = itertools.count(1)
+        self.cancels = _cancels = context.RawArray("q", CANCEL_SLOTS)
+        self.workers = _workers = context.RawArray("q", 2 * CANCEL_SLOTS)
+        self.pool = context.Pool(processes)
+        # Streams go through queues of a manager process
+        self.manager = context.Manager()
+
+    def with_params(
+        self,
+        max_words_per_sentence=None,
+        split_by_punctuation=None,
+        max_total_words=None,
+    ):
+        """
+        See `Chunker.with_params`, the pool shares the workers and the result
+        cache of this pool
+        """
+        params = dict(self.overrides)
+        for name, value in (
+            ("max_words_per_sentence", max_words_per_sentence),
+            ("split_by_punctuation", split_by_punctuation),
+            ("max_total_words", max_total_words),
+        ):
+            if value is not None:
+                params[name] = value
+        # Raises for parameters out of range
+        chunker = self.chunker.with_params(**params)
+        if params == self.overrides:
+            return self
+
+        pool = copy.copy(self)
+        pool.max_words = chunker.max_words
+        pool.split_by_punctuation = chunker.split_by_punctuation
+        pool.max_total_words = chunker.max_total_words
+        pool.overrides = params
+        return pool
+
+    def _apply(self, function, args, deadline):
+        # Run `function(*args, overrides, expires, request)` in a worker,
+        # where `expires` is the wall clock time `deadline` expires at and
+        # `request` the number of the request. Returns the task, the
+        # `CancelFlag` of the request and whether its worker is lost
+        remaining = deadline.remaining()
+        expires = None if remaining is None else time.time() + remaining
+        request = next(self.requests)
+        args += (self.overrides, expires, request)
+
+        def done(_):
+            # Holds the arguments until the worker is done with them, the
+            # manager drops the queue of a stream once nobody holds it
+            return args
+
+        task = self.pool.apply_async(
+            function, args, callback=done, error_callback=done
+        )
+        return task, CancelFlag(self.cancels, request), self._lost(request)
+
+    def _lost(self, request):
+        # Whether the worker that took the request died, workers that die
+        # are replaced in the pool by new ones
+        worker = RequestWorker(self.workers, request)
+
+        def lost():
+            pid = worker.pid()
+            return pid is not None and not any(
+                process.pid == pid and process.is_alive()
+                for process in list(self.pool._pool)
+            )
+
+        return lost
+
+    @property
+    def params(self):
+        return (
+            self.max_words,
+            self.split_by_punctuation,
+            self.max_total_words,
+            self.lm_window,
+            self.lm_beam,
+        )
+
+    def iter_segment(
+        self,
+        text,
+        segmenter_type="lm",
+        parse_ssml=False,
+        memo=None,
+        deadline=None,
+        long_document=False,
+        with_offsets=False,
+    ):
+        """
+        See `Chunker.iter_segment`, `memo` is not shared with workers. Chunks
+        are waited for within the time budget of `deadline`, see `_wait`, and
+        the worker stops once `deadline` is cancelled or the stream closed
+        """
+        if deadline is None:
+            deadline = Deadline()
+        deadline.strategy = segmenter_type
+
+        key = digest(text, segmenter_type, parse_ssml, with_offsets, *self.params)
+        result = None
+        if not long_document:
+            result = deadline.stats.lookup("result", self.result_cache, key)
+        if result is not None:
+            yield from result
+            return
+
+        chunks = self.manager.Queue()
+        _, cancel, lost = self._apply(
+            _stream,
+            (chunks, text, segmenter_type, parse_ssml, long_document, with_offsets),
+            deadline,
+        )
+
+        result = []
+        done = False
+        try:
+            while True:
+                chunk = _wait(chunks.get, deadline, cancel, lost)
+                if type(chunk) is tuple:
+                    deadline.strategy, stats = chunk
+                    deadline.stats.merge(stats)
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                if not long_document:
+                    result.append(chunk)
+                yield chunk
+            done = True
+        finally:
+            # Closed before the end, nobody reads the chunks anymore
+            if not done:
+                cancel.set()
+        # Only complete results of the requested segmenter are cached
+        if not long_document and deadline.strategy == segmenter_type:
+            self.result_cache.put(key, tuple(result))
+
+    def segment(
+        self,
+        text,
+        segmenter_type="lm",
+        parse_ssml=False,
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        See `Chunker.segment`, `memo` is not shared with workers and the
+        result is waited for within the time budget of `deadline`, see
+        `_wait`
+        """
+        return self.segment_async(
+            text, segmenter_type, parse_ssml, memo, deadline, with_offsets
+        ).get()
+
+    def segment_async(
+        self,
+        text,
+        segmenter_type="lm",
+        parse_ssml=False,
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        `segment` submitted to a worker right away, as a `PendingResult`, so
+        the workers chunk several texts at once
+        """
+        if deadline is None:
+            deadline = Deadline()
+        deadline.strategy = segmenter_type
+
+        key = digest(text, segmenter_type, parse_ssml, with_offsets, *self.params)
+        result = deadline.stats.lookup("result", self.result_cache, key)
+        if result is not None:
+
+            def cached():
+                deadline.strategy = segmenter_type
+                return list(result)
+
+            return PendingResult(cached)
+
+        task, cancel, lost = self._apply(
+            _segment, (text, segmenter_type, parse_ssml, with_offsets), deadline
+        )
+
+        def get():
+            result, deadline.strategy, stats = _wait(
+                task.get, deadline, cancel, lost
+            )
+            deadline.stats.merge(stats)
+            if deadline.strategy == segmenter_type:
+                self.result_cache.put(key, tuple(result))
+            return list(result)
+
+        return PendingResult(get, cancel.set)
+
+    def segment_page(
+        self,
+        text,
+        offset=0,
+        segmenter_type="lm",
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        See `Chunker.segment_page`, `memo` is not shared with workers and the
+        page is waited for within the time budget of `deadline`, see `_wait`
+        """
+        return self.segment_page_async(
+            text, offset, segmenter_type, memo, deadline, with_offsets
+        ).get()
+
+    def segment_page_async(
+        self,
+        text,
+        offset=0,
+        segmenter_type="lm",
+        memo=None,
+        deadline=None,
+        with_offsets=False,
+    ):
+        """
+        `segment_page` submitted to a worker right away, as a
+        `PendingResult`, so the workers chunk several pages at once
+        """
+        if deadline is None:
+            deadline = Deadline()
+        task, cancel, lost = self._apply(
+            _segment_page, (text, offset, segmenter_type, with_offsets), deadline
+        )
+
+        def get():
+            result, deadline.strategy, stats = _wait(
+                task.get, deadline, cancel, lost
+            )
+            deadline.stats.merge(stats)
+            return result
+
+        return PendingResult(get, cancel.set)
+
+    def close(self):
+        self.pool.terminate()
+        self.manager.shutdown()
+
+
+def create_chunker(configs, language_model_path=None):
+    """
+    `Chunker` chunking in the calling process, or a `ChunkerPool` of worker
+    processes when the `executor` config is "process", of the model at
+    `language_model_path` or else at the `chunker_lm_path` config
+    """
+    args = (
+        language_model_path or configs["chunker_lm_path"],
+        configs["max_words_per_sentence"],
+        configs["split_by_punctuation"],
+        configs["max_total_words"],
+    )
+    kwargs = dict(
+        span_cache_size=configs["span_cache_size"],
+        result_cache_size=configs["result_cache_mb"] * 2 ** 20,
+        result_cache_ttl=configs["result_cache_ttl"],
+        lm_load_method=configs["chunker_lm_load_method"],
+        lm_window=configs["lm_window"],
+        lm_beam=configs["lm_beam"],
+        max_words_per_sentence_limit=configs["max_words_per_sentence_limit"],
+        max_total_words_limit=configs["max_total_words_limit"],
+    )
+
+    if configs["executor"] == "process":
+        processes = configs["process_workers"] or os.cpu_count()
+        return ChunkerPool(processes, *args, **kwargs)
+    elif configs["executor"] == "thread":
+        return Chunker(*args, **kwargs)
+    else:
+        raise ValueError("Invalid executor: '{}'".format(configs["executor"]))
@@ -0,0 +1,147 @@
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from utterance_segmentation.utils import InvalidRequest
+
+logger = logging.getLogger(__name__)
+
+# Profiles are cut after this many seconds, a profile asked for by mistake
+# can't slow the server for long
+MAX_SECONDS = 60
+# Seconds between samples. Sampling walks the stack of every thread while
+# holding the GIL, so it is kept well above the cost of a walk
+DEFAULT_INTERVAL = 0.01
+MIN_INTERVAL = 0.001
+
+
+class ProfilerBusy(Exception):
+    """
+    raised when a profile is asked for while another one runs
+    """
+
+
+class SamplingProfiler(object):
+    """
+    Wall-clock profiler sampling the stacks of every thread of the process
+    every `interval` seconds from a thread of its own, so the profiled code
+    is neither changed nor traced and requests keep being served while it
+    runs. Only one profile runs at a time in a process.
+
+    Stacks are counted in the collapsed format of flame graph tools, one
+    "outer;...;inner count" line per stack. Threads waiting for work are
+    sampled too, their stacks end in the waiting call
+    """
+
+    _running = threading.Lock()
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        # Labels of the code objects seen, formatted once
+        self._labels = {}
+
+    def label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = "{} ({}:{})".format(
+                code.co_name, code.co_filename, code.co_firstlineno
+            )
+        return label
+
+    def sample(self, ignore=None):
+        """
+        Count the current stack of every thread but `ignore`
+        """
+        for ident, frame in sys._current_frames().items():
+            if ident == ignore:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds):
+        """
+        Sample the process for `seconds`, from the calling thread.
+
+        Raises `ProfilerBusy` when another profile runs
+        """
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already running")
+        try:
+            ident = threading.get_ident()
+            ends = time.monotonic() + seconds
+            while time.monotonic() < ends:
+                self.sample(ident)
+                time.sleep(self.interval)
+        finally:
+            self._running.release()
+        return self
+
+    def collapsed(self):
+        return "".join(
+            "{} {}\n".format(stack, count)
+            for stack, count in sorted(self.stacks.items())
+        )
+
+
+def profile(seconds, interval=DEFAULT_INTERVAL):
+    """
+    `SamplingProfiler` of the process sampled for `seconds`, at most
+    `MAX_SECONDS`.
+
+    Raises `InvalidRequest` when `seconds` or `interval` are out of range and
+    `ProfilerBusy` when another profile runs
+    """
+    if seconds <= 0:
+        raise InvalidRequest("seconds must be positive")
+    if interval < MIN_INTERVAL:
+        raise InvalidRequest("interval must be at least {}s".format(MIN_INTERVAL))
+    return SamplingProfiler(interval).run(min(seconds, MAX_SECONDS))
+
+
+def write_profile(directory, seconds):
+    """
+    Profile the process for `seconds` and write the collapsed stacks to a
+    file of `directory`, the temporary directory when empty
+    """
+    try:
+        profiler = profile(seconds)
+    except ProfilerBusy:
+        logger.warning("a profile is already running")
+        return None
+    path = os.path.join(
+        directory or tempfile.gettempdir(),
+        "chunker-{}-{}.folded".format(os.getpid(), time.strftime("%Y%m%d-%H%M%S")),
+    )
+    with open(path, "w") as f:
+        f.write(profiler.collapsed())
+    logger.warning("wrote a profile of %d samples to %s", profiler.samples, path)
+    return path
+
+
+def profile_on_signal(directory, seconds, signum=signal.SIGUSR1):
+    """
+    Profile the process for `seconds` in the background on `signum`, see
+    `write_profile`, from the main thread only. With the process executor,
+    only the serving process is profiled, not its workers
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def start(signum, frame):
+        threading.Thread(
+            target=write_profile, args=(directory, seconds), daemon=True
+        ).start()
+
+    signal.signal(signum, start)
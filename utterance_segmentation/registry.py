@@ -0,0 +1,371 @@
+import logging
+import mmap
+import os
+import resource
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from utterance_segmentation.pool import create_chunker
+from utterance_segmentation.utils import InvalidRequest
+
+logger = logging.getLogger(__name__)
+
+# Name of the model of `chunker_lm_path`, used by requests naming no model
+DEFAULT_MODEL = ""
+
+# Texts chunked by models before they serve requests, plain text long
+# enough for the language model and SSML, along with whether they are SSML
+WARM_UP_TEXT = "هذا نص قصير يقطع بالنموذج الجديد قبل أن يستقبل الطلبات"
+WARM_UP_TEXTS = (
+    (" ".join([WARM_UP_TEXT] * 4), False),
+    ("{0}، {0}. {0}؟ {0}".format(WARM_UP_TEXT), False),
+    (
+        '<speak><p>{0}</p><break time="500ms"/><s>{0} {0}</s>'
+        '<prosody rate="slow">{0}</prosody></speak>'.format(WARM_UP_TEXT),
+        True,
+    ),
+)
+
+
+class ModelLoading(Exception):
+    """
+    the model is being loaded for another request, retry once it is loaded
+    """
+
+
+def model_size(path):
+    """
+    bytes a model is counted for against the memory budget, the size of its
+    file which binary models are mapped from
+    """
+    return os.path.getsize(path)
+
+
+def warm_up(chunker):
+    """
+    Chunk representative texts with both segmenters, so the first requests
+    don't pay for the pages and code paths they touch
+    """
+    for text, parse_ssml in WARM_UP_TEXTS:
+        for segmenter_type in ("lm", "max"):
+            chunker.segment(text, segmenter_type, parse_ssml)
+
+
+def prefault(path):
+    """
+    Read the file at `path` into the page cache, so a model mapped from it
+    doesn't fault its pages in from disk while serving. Returns the pages
+    read
+    """
+    buffer = bytearray(2 ** 20)
+    size = 0
+    with open(path, "rb", buffering=0) as f:
+        read = f.readinto(buffer)
+        while read:
+            size += read
+            read = f.readinto(buffer)
+    return -(-size // mmap.PAGESIZE)
+
+
+def page_faults():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_minflt, usage.ru_majflt
+
+
+class ModelRegistry(object):
+    """
+    Thread-safe registry of chunkers by model name, loading every model on
+    first use with `load(path)`.
+
+    Loaded models are counted against a `budget` of bytes, 0 for no budget,
+    and the least recently used ones are evicted to make room for a model
+    being loaded. A model is only loaded once, by the first request for it,
+    and the requests for it meanwhile fail right away instead of holding
+    threads that requests for other models are served from.
+
+    Loaded models can be reloaded from their files while they serve
+    requests, see `reload`, unless `reloadable` is unset
+    """
+
+    def __init__(self, paths, load, budget=0, warm=None, reloadable=True):
+
+        self.paths = dict(paths)
+        self.load = load
+        self.budget = budget
+        self.warm = warm
+        self.reloadable = reloadable
+        self.weight = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+        self._reloading = set()
+        # `ModelWatcher` reloading changed models, if any
+        self.watcher = None
+        # Futures and sizes of the loaded and loading models, most recently
+        # used last
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def loaded(self):
+        """
+        names of the loaded models, least recently used first
+        """
+        with self._lock:
+            return [name for name, (model, _) in self._models.items() if model.done()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": sum(model.done() for model, _ in self._models.values()),
+                "weight": self.weight,
+                "budget": self.budget,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+            }
+
+    def get(self, name=DEFAULT_MODEL):
+        """
+        Chunker of model `name`, loaded and counted against the budget first
+        when it is not loaded yet.
+
+        Raises `InvalidRequest` for unknown models and `ModelLoading` while
+        another request loads the model
+        """
+        if name not in self.paths:
+            raise InvalidRequest("unknown model: '{}'".format(name))
+
+        load = False
+        with self._lock:
+            if name in self._models:
+                model, _ = self._models[name]
+                self._models.move_to_end(name)
+            else:
+                model = Future()
+                size = model_size(self.paths[name])
+                self.__evict(size)
+                self._models[name] = (model, size)
+                self.weight += size
+                load = True
+        if not load:
+            if not model.done():
+                raise ModelLoading("model '{}' is loading, retry later".format(name))
+            return model.result()
+
+        try:
+            model.set_result(self.load(self.paths[name]))
+        except Exception as exception:
+            with self._lock:
+                del self._models[name]
+                self.weight -= size
+            model.set_exception(exception)
+            raise
+        with self._lock:
+            self.loads += 1
+        return model.result()
+
+    def warm_up(self, name=DEFAULT_MODEL, prefault_file=False):
+        """
+        Warm model `name` up, loading it first if needed, after reading its
+        file into the page cache when `prefault_file` is set. Logs the time
+        it took and the pages it touched, counted as page faults of the
+        process
+        """
+        started = time.monotonic()
+        minor, major = page_faults()
+        pages = prefault(self.paths[name]) if prefault_file else 0
+        chunker = self.get(name)
+        if self.warm is not None:
+            self.warm(chunker)
+        now_minor, now_major = page_faults()
+        logger.info(
+            "warmed up model '%s' in %.2fs, %d pages prefaulted, %d page "
+            "faults (%d major)",
+            name,
+            time.monotonic() - started,
+            pages,
+            now_minor - minor + now_major - major,
+            now_major - major,
+        )
+        return chunker
+
+    def reload(self, name=DEFAULT_MODEL):
+        """
+        Load model `name` again from its file, warm it up and swap it in
+        for the loaded one. Requests keep being served by the loaded model
+        until the swap, and requests already using it keep it until they are
+        done. Models not loaded are left to load on first use.
+
+        Returns whether the model was reloaded
+        """
+        with self._lock:
+            model = self._models.get(name)
+            if model is None or not model[0].done() or name in self._reloading:
+                return False
+            if not self.reloadable:
+                logger.warning("model '%s' can't be reloaded, restart instead", name)
+                return False
+            self._reloading.add(name)
+
+        try:
+            path = self.paths[name]
+            size = model_size(path)
+            chunker = self.load(path)
+            if self.warm is not None:
+                self.warm(chunker)
+
+            model = Future()
+            model.set_result(chunker)
+            with self._lock:
+                # Unless it was evicted meanwhile
+                if name in self._models:
+                    _, previous_size = self._models[name]
+                    self._models[name] = (model, size)
+                    self.weight += size - previous_size
+                self.reloads += 1
+        finally:
+            with self._lock:
+                self._reloading.discard(name)
+        logger.info("reloaded model '%s' from %s", name, path)
+        return True
+
+    def reload_in_background(self, names=None):
+        """
+        `reload` the models `names`, all the loaded ones by default, in a
+        thread
+        """
+
+        def reload_all():
+            for name in names or self.loaded():
+                try:
+                    self.reload(name)
+                except Exception:
+                    logger.exception("reloading model '%s' failed", name)
+
+        thread = threading.Thread(target=reload_all, daemon=True)
+        thread.start()
+        return thread
+
+    def __evict(self, size):
+        # Evict least recently used models until `size` more bytes fit,
+        # models still loading are never evicted
+        if self.budget <= 0:
+            return
+        for name, (model, evicted_size) in list(self._models.items()):
+            if self.weight + size <= self.budget:
+                break
+            if model.done():
+                del self._models[name]
+                self.weight -= evicted_size
+                self.evictions += 1
+
+
+def file_state(path):
+    # Moving a new file in place changes the inode, copying over the file
+    # its size or modification time
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ModelWatcher(threading.Thread):
+    """
+    Reloads the models of `registry` when their files change, checking them
+    every `seconds`.
+
+    A changed file is only reloaded once it did not change for a whole
+    check, so a file being copied is not loaded half written. New models
+    should still be moved in place: overwriting the file of a binary model
+    changes the pages the loaded model is mapped from
+    """
+
+    def __init__(self, registry, seconds):
+
+        super().__init__(daemon=True)
+        self.registry = registry
+        self.seconds = seconds
+        self.states = {
+            name: file_state(path) for name, path in registry.paths.items()
+        }
+        self.changed = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.seconds):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("checking model files failed")
+
+    def check(self):
+        for name, path in self.registry.paths.items():
+            state = file_state(path)
+            if state is None or state == self.states[name]:
+                self.changed.pop(name, None)
+            elif self.changed.get(name) != state:
+                # Changing, wait for the next check
+                self.changed[name] = state
+            else:
+                self.states[name] = state
+                del self.changed[name]
+                self.registry.reload(name)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def reload_on_signal(registry, signum=signal.SIGHUP):
+    """
+    Reload the loaded models of `registry` in the background on `signum`,
+    from the main thread only
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signum, lambda signum, frame: registry.reload_in_background())
+
+
+def parse_model_paths(value):
+    """
+    `{name: path}` of a "name=path,name=path" config value
+    """
+    paths = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, sep, path = item.partition("=")
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError("Invalid model: '{}'".format(item))
+        paths[name.strip()] = path.strip()
+    return paths
+
+
+def create_registry(configs):
+    """
+    `ModelRegistry` of the `chunker_lm_path` model, loaded right away, and of
+    the `chunker_lm_paths` models, loaded on first use. Models are reloaded
+    when their files change if `lm_watch_seconds` is set
+    """
+    paths = parse_model_paths(configs["chunker_lm_paths"])
+    paths[DEFAULT_MODEL] = configs["chunker_lm_path"]
+    if len(paths) > 1 and configs["executor"] == "process":
+        # Worker pools can't be forked once the server runs threads
+        raise ValueError("Several models need the 'thread' executor")
+
+    registry = ModelRegistry(
+        paths,
+        lambda path: create_chunker(configs, path),
+        configs["lm_memory_mb"] * 2 ** 20,
+        warm=warm_up,
+        # The same goes for the pool of a reloaded model
+        reloadable=configs["executor"] == "thread",
+    )
+    registry.get(DEFAULT_MODEL)
+    if configs["lm_watch_seconds"] > 0 and registry.reloadable:
+        registry.watcher = ModelWatcher(registry, configs["lm_watch_seconds"])
+        registry.watcher.start()
+    return registry
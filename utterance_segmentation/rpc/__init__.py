@@ -1,12 +1,36 @@
 import sys
 
 sys.path.insert(1, ".")
+from asyncio import CancelledError
 from functools import wraps
+from inspect import isasyncgenfunction, iscoroutinefunction, isgeneratorfunction
 from types import FunctionType
 from traceback import print_exc
 import grpc
 
 
+class AbortRecorder(object):
+    """
+    proxy of a servicer context recording whether the servicer aborted, works
+    the same for sync and asyncio servicer contexts
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self.aborted = False
+
+    def abort(self, code, details):
+        self.aborted = True
+        return self.context.abort(code, details)
+
+    def abort_with_status(self, status):
+        self.aborted = True
+        return self.context.abort_with_status(status)
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+
 class AbortableRPC(type):
     """
     metaclass to wrap RPC methods seamlessly with graceful handling for
@@ -22,7 +46,7 @@ class AbortableRPC(type):
 
         for attr in superclass_attributes:
             # select RPC methods only
-            if type(attributedict[attr]) is FunctionType:
+            if type(attributedict.get(attr)) is FunctionType:
                 attributedict[attr] = cls.abortable(clsname, attributedict[attr])
 
         return super(AbortableRPC, cls).__new__(
@@ -34,46 +58,124 @@ class AbortableRPC(type):
         decorator to gracefully handle aborts from RPC methods
         """
 
-        @wraps(func)
-        def wrapper(*args, **kwargs):
+        def record_aborts(args):
+            # RPC methods are called as `method(servicer, request, context)`
+            assert args and args[0].__class__.__name__ == servicer_cls, (
+                "can't find servicer"
+            )
+            assert len(args) == 3 and hasattr(args[-1], "abort"), (
+                "can't find context"
+            )
 
-            try:
+            return args[:-1] + (AbortRecorder(args[-1]),)
+
+        def should_raise(context):
+            if context and context.aborted:
+                # server willingly aborted
+                return True
+            print_exc()
+            return context is None
+
+        if iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
 
                 context = None
-                servicer = None
 
-                CONTEXT_TYPE = grpc._server._Context
+                try:
 
-                for arg in args:
-                    if arg.__class__.__name__ == servicer_cls:
-                        servicer = arg
-                        break
+                    args = record_aborts(args)
+                    context = args[-1]
 
-                assert servicer, "can't find servicer"
+                    return await func(*args, **kwargs)
 
-                for arg in args:
-                    if type(arg) is CONTEXT_TYPE:
-                        context = arg
-                        break
+                except CancelledError:
+                    # the client went away, nobody to answer
+                    raise
 
-                assert context, "can't find context"
+                except Exception as e:
 
-                result = func(*args, **kwargs)
+                    if should_raise(context):
+                        raise
+                    await context.abort(
+                        grpc.StatusCode.INTERNAL, "server got itself in trouble"
+                    )
 
-                return result
+            return async_wrapper
 
-            except Exception as e:
+        if isasyncgenfunction(func):
+
+            @wraps(func)
+            async def async_stream_wrapper(*args, **kwargs):
+
+                context = None
+
+                try:
+
+                    args = record_aborts(args)
+                    context = args[-1]
+
+                    async for response in func(*args, **kwargs):
+                        yield response
+
+                except CancelledError:
+                    # the client went away, nobody to answer
+                    raise
 
-                if context:
-                    if context._state.aborted:
-                        # server willingly aborted
+                except Exception as e:
+
+                    if should_raise(context):
+                        raise
+                    await context.abort(
+                        grpc.StatusCode.INTERNAL, "server got itself in trouble"
+                    )
+
+            return async_stream_wrapper
+
+        if isgeneratorfunction(func):
+            # server-streaming methods fail while being iterated
+
+            @wraps(func)
+            def stream_wrapper(*args, **kwargs):
+
+                context = None
+
+                try:
+
+                    args = record_aborts(args)
+                    context = args[-1]
+
+                    yield from func(*args, **kwargs)
+
+                except Exception as e:
+
+                    if should_raise(context):
                         raise
-                    print_exc()
                     context.abort(
                         grpc.StatusCode.INTERNAL, "server got itself in trouble"
                     )
-                else:
-                    print_exc()
+
+            return stream_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+
+            context = None
+
+            try:
+
+                args = record_aborts(args)
+                context = args[-1]
+
+                result = func(*args, **kwargs)
+
+                return result
+
+            except Exception as e:
+
+                if should_raise(context):
                     raise
+                context.abort(grpc.StatusCode.INTERNAL, "server got itself in trouble")
 
         return wrapper
@@ -0,0 +1,113 @@
+import threading
+from concurrent import futures
+from traceback import print_exc
+
+import grpc
+from grpc_health.v1.health import HealthServicer
+from grpc_health.v1.health_pb2 import DESCRIPTOR as health_Descriptor
+from grpc_health.v1.health_pb2 import HealthCheckResponse
+from grpc_health.v1.health_pb2_grpc import add_HealthServicer_to_server
+from grpc_reflection.v1alpha import reflection
+
+import utterance_segmentation.rpc.utterance_segmentation_pb2 as uspb2
+import utterance_segmentation.rpc.utterance_segmentation_pb2_grpc as uspb2_grpc
+import utterance_segmentation.rpc.utterance_segmentation_servicer as US
+from config import config
+from utterance_segmentation.profiler import profile_on_signal
+from utterance_segmentation.registry import reload_on_signal
+
+
+def create_health_servicer(models, params):
+    """
+    `HealthServicer` reporting NOT_SERVING until the default model of
+    `models` is warmed up, in a thread so the port binds meanwhile
+    """
+    health = HealthServicer()
+    services = (
+        "",
+        uspb2.DESCRIPTOR.services_by_name["utterance_segmentation"].full_name,
+    )
+    for service in services:
+        health.set(service, HealthCheckResponse.NOT_SERVING)
+
+    def warm_up():
+        try:
+            models.warm_up(prefault_file=params["lm_prefault"])
+        except Exception:
+            print_exc()
+            return
+        for service in services:
+            health.set(service, HealthCheckResponse.SERVING)
+
+    threading.Thread(target=warm_up, daemon=True).start()
+    return health
+
+
+def create_RPC_service(**kwargs):
+    params = config
+    params.update(kwargs)
+
+    server_info = (
+        uspb2.DESCRIPTOR.services_by_name["utterance_segmentation"].full_name,
+        health_Descriptor.services_by_name["Health"].full_name,
+        reflection.SERVICE_NAME,
+    )
+    # create the servicer first, worker processes must be forked before
+    # gRPC starts any thread
+    servicer = US.USServicer(config)
+    reload_on_signal(servicer.models)
+    profile_on_signal(params["profile_dir"], params["profile_seconds"])
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=params["workers"]))
+
+    uspb2_grpc.add_utterance_segmentationServicer_to_server(servicer, server)
+    add_HealthServicer_to_server(
+        create_health_servicer(servicer.models, params), server
+    )
+    server.add_insecure_port("0.0.0.0:{}".format(params["port"]))
+    reflection.enable_server_reflection(server_info, server)
+
+    return server
+
+
+def create_async_RPC_service(**kwargs):
+    params = config
+    params.update(kwargs)
+
+    server_info = (
+        uspb2.DESCRIPTOR.services_by_name["utterance_segmentation"].full_name,
+        health_Descriptor.services_by_name["Health"].full_name,
+        reflection.SERVICE_NAME,
+    )
+    # The asyncio servicer is only imported for asyncio servers. asyncio
+    # itself is not spared, grpc imports it
+    import utterance_segmentation.rpc.utterance_segmentation_aio_servicer as USAio
+
+    # create the servicer first, worker processes must be forked before
+    # gRPC starts any thread
+    servicer = USAio.AsyncUSServicer(config)
+    reload_on_signal(servicer.models)
+    profile_on_signal(params["profile_dir"], params["profile_seconds"])
+
+    # sync servicers (health) run in the migration thread pool
+    server = grpc.aio.server(
+        migration_thread_pool=futures.ThreadPoolExecutor(
+            max_workers=params["workers"]
+        )
+    )
+
+    uspb2_grpc.add_utterance_segmentationServicer_to_server(servicer, server)
+    add_HealthServicer_to_server(
+        create_health_servicer(servicer.models, params), server
+    )
+    server.add_insecure_port("0.0.0.0:{}".format(params["port"]))
+    reflection.enable_server_reflection(server_info, server)
+
+    return server
+
+
+async def serve_async():
+    service = create_async_RPC_service()
+    await service.start()
+    print("starting on 0.0.0.0:{}".format(config["port"]))
+    await service.wait_for_termination()
@@ -0,0 +1,122 @@
+import asyncio
+from concurrent import futures
+
+import grpc
+
+import utterance_segmentation.rpc.utterance_segmentation_pb2 as uspb2
+from utterance_segmentation.deadline import Cancelled, Deadline
+from utterance_segmentation.metrics import METRICS
+from utterance_segmentation.profiler import ProfilerBusy
+from utterance_segmentation.registry import ModelLoading, create_registry
+from utterance_segmentation.rpc.utterance_segmentation_pb2_grpc import (
+    utterance_segmentationServicer as BaseServicer,
+)
+from utterance_segmentation.rpc.utterance_segmentation_servicer import (
+    batch_responses,
+    chunk_response,
+    chunks_response,
+    profile_response,
+    request_chunker,
+)
+from utterance_segmentation.utils import InvalidRequest
+
+from . import AbortableRPC
+
+
+class AsyncUSServicer(BaseServicer, metaclass=AbortableRPC):
+    """
+    asyncio equivalent of `USServicer` for `grpc.aio` servers.
+
+    Chunking is CPU-bound, it runs in `executor` so the event loop only
+    handles I/O. When a client cancels, the running chunking stops at the
+    next chunk instead of finishing for nobody
+    """
+
+    def __init__(self, configs, executor=None):
+
+        self.configs = configs
+        self.models = create_registry(self.configs)
+        self.executor = executor or futures.ThreadPoolExecutor(
+            max_workers=self.configs["workers"]
+        )
+
+    async def run_cancellable(self, deadline, function, *args):
+        """
+        run `function(*args)` in the executor, cancelling `deadline` when the
+        RPC is cancelled
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, function, *args)
+        except asyncio.CancelledError:
+            deadline.cancel()
+            raise
+
+    async def chunk(self, request: uspb2.USRequest, context):
+        deadline = Deadline(context.time_remaining())
+        try:
+            with METRICS.request("grpc", "chunk", deadline):
+                return await self.run_cancellable(
+                    deadline, chunk_response, self.models, request, None, deadline
+                )
+        except InvalidRequest as exception:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(exception))
+        except ModelLoading as exception:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, str(exception))
+        except Cancelled:
+            await context.abort(grpc.StatusCode.CANCELLED, "request cancelled")
+
+    async def chunk_stream(self, request: uspb2.USRequest, context):
+        deadline = Deadline(context.time_remaining())
+        try:
+            with METRICS.request("grpc", "chunk_stream", deadline):
+                # Models load in the executor, not to hold up the event loop
+                chunker = await self.run_cancellable(
+                    deadline, request_chunker, self.models, request
+                )
+                chunks = chunker.iter_segment(
+                    request.text,
+                    segmenter_type=request.segmenter_type or "lm",
+                    parse_ssml=request.parse_ssml,
+                    deadline=deadline,
+                    long_document=request.long_document,
+                    with_offsets=request.with_offsets,
+                )
+                while True:
+                    # Chunk one step at a time, a cancelled stream stops here
+                    chunk = await self.run_cancellable(deadline, next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunks_response(
+                        [chunk], request, strategy=deadline.strategy
+                    )
+        except InvalidRequest as exception:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(exception))
+        except ModelLoading as exception:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, str(exception))
+        except Cancelled:
+            await context.abort(grpc.StatusCode.CANCELLED, "request cancelled")
+
+    async def chunk_batch(self, request: uspb2.USBatchRequest, context):
+        deadline = Deadline(context.time_remaining())
+        with METRICS.request("grpc", "chunk_batch", deadline):
+            responses = await self.run_cancellable(
+                deadline, batch_responses, self.models, request.requests, deadline
+            )
+        return uspb2.USBatchResponse(responses=responses)
+
+    async def metrics(self, request: uspb2.MetricsRequest, context):
+        return uspb2.MetricsResponse(text=METRICS.render(self.models))
+
+    async def profile(self, request: uspb2.ProfileRequest, context):
+        loop = asyncio.get_running_loop()
+        try:
+            # Sampled from a thread of the default executor, so profiling
+            # takes no thread from chunking
+            return await loop.run_in_executor(
+                None, profile_response, self.configs, request
+            )
+        except InvalidRequest as exception:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(exception))
+        except ProfilerBusy as exception:
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(exception))
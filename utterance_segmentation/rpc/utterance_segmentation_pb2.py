@@ -11,6 +11,7 @@ from google.protobuf import symbol_database as _symbol_database
 _sym_db = _symbol_database.Default()
 
 
+from google.protobuf import wrappers_pb2 as google_dot_protobuf_dot_wrappers__pb2
 
 
 DESCRIPTOR = _descriptor.FileDescriptor(
@@ -19,8 +20,9 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   syntax='proto3',
   serialized_options=None,
   create_key=_descriptor._internal_create_key,
-  serialized_pb=b'\n7utterance_segmentation/rpc/utterance_segmentation.proto\"E\n\tUSRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x16\n\x0esegmenter_type\x18\x02 \x01(\t\x12\x12\n\nparse_ssml\x18\x03 \x01(\x08\"\x1a\n\nUSResponse\x12\x0c\n\x04text\x18\x01 \x03(\t2:\n\x16utterance_segmentation\x12 \n\x05\x63hunk\x12\n.USRequest\x1a\x0b.USResponseb\x06proto3'
-)
+  serialized_pb=b'\n7utterance_segmentation/rpc/utterance_segmentation.proto\x1a\x1egoogle/protobuf/wrappers.proto\"\xbe\x02\n\tUSRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\x12\x16\n\x0esegmenter_type\x18\x02 \x01(\t\x12\x12\n\nparse_ssml\x18\x03 \x01(\x08\x12\x15\n\rlong_document\x18\x04 \x01(\x08\x12\x0e\n\x06offset\x18\x05 \x01(\x03\x12\x14\n\x0cwith_offsets\x18\x06 \x01(\x08\x12;\n\x16max_words_per_sentence\x18\x07 \x01(\x0b\x32\x1b.google.protobuf.Int32Value\x12\x38\n\x14split_by_punctuation\x18\x08 \x01(\x0b\x32\x1a.google.protobuf.BoolValue\x12\x34\n\x0fmax_total_words\x18\t \x01(\x0b\x32\x1b.google.protobuf.Int32Value\x12\r\n\x05model\x18\n \x01(\t\"$\n\x06Offset\x12\r\n\x05start\x18\x01 \x01(\x03\x12\x0b\n\x03\x65nd\x18\x02 \x01(\x03\"{\n\nUSResponse\x12\x0c\n\x04text\x18\x01 \x03(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\x0e\n\x06reason\x18\x03 \x01(\t\x12\x10\n\x08strategy\x18\x04 \x01(\t\x12\x13\n\x0bnext_offset\x18\x05 \x01(\x03\x12\x18\n\x07offsets\x18\x06 \x03(\x0b\x32\x07.Offset\".\n\x0eUSBatchRequest\x12\x1c\n\x08requests\x18\x01 \x03(\x0b\x32\n.USRequest\"1\n\x0fUSBatchResponse\x12\x1e\n\tresponses\x18\x01 \x03(\x0b\x32\x0b.USResponse\"\x10\n\x0eMetricsRequest\"\x1f\n\x0fMetricsResponse\x12\x0c\n\x04text\x18\x01 \x01(\t\"6\n\x0eProfileRequest\x12\x0f\n\x07seconds\x18\x01 \x01(\x01\x12\x13\n\x0binterval_ms\x18\x02 \x01(\x01\"5\n\x0fProfileResponse\x12\x11\n\tcollapsed\x18\x01 \x01(\t\x12\x0f\n\x07samples\x18\x02 \x01(\x03\x32\xf3\x01\n\x16utterance_segmentation\x12 \n\x05\x63hunk\x12\n.USRequest\x1a\x0b.USResponse\x12\x30\n\x0b\x63hunk_batch\x12\x0f.USBatchRequest\x1a\x10.USBatchResponse\x12)\n\x0c\x63hunk_stream\x12\n.USRequest\x1a\x0b.USResponse0\x01\x12,\n\x07metrics\x12\x0f.MetricsRequest\x1a\x10.MetricsResponse\x12,\n\x07profile\x12\x0f.ProfileRequest\x1a\x10.ProfileResponseb\x06proto3'
+  ,
+  dependencies=[google_dot_protobuf_dot_wrappers__pb2.DESCRIPTOR,])
 
 
 
@@ -54,6 +56,55 @@ _USREQUEST = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='long_document', full_name='USRequest.long_document', index=3,
+      number=4, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='offset', full_name='USRequest.offset', index=4,
+      number=5, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='with_offsets', full_name='USRequest.with_offsets', index=5,
+      number=6, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='max_words_per_sentence', full_name='USRequest.max_words_per_sentence', index=6,
+      number=7, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='split_by_punctuation', full_name='USRequest.split_by_punctuation', index=7,
+      number=8, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='max_total_words', full_name='USRequest.max_total_words', index=8,
+      number=9, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='model', full_name='USRequest.model', index=9,
+      number=10, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
   ],
   extensions=[
   ],
@@ -66,8 +117,47 @@ _USREQUEST = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=59,
-  serialized_end=128,
+  serialized_start=92,
+  serialized_end=410,
+)
+
+
+_OFFSET = _descriptor.Descriptor(
+  name='Offset',
+  full_name='Offset',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='start', full_name='Offset.start', index=0,
+      number=1, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='end', full_name='Offset.end', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=412,
+  serialized_end=448,
 )
 
 
@@ -86,6 +176,162 @@ _USRESPONSE = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='status', full_name='USResponse.status', index=1,
+      number=2, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='reason', full_name='USResponse.reason', index=2,
+      number=3, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='strategy', full_name='USResponse.strategy', index=3,
+      number=4, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='next_offset', full_name='USResponse.next_offset', index=4,
+      number=5, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='offsets', full_name='USResponse.offsets', index=5,
+      number=6, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=450,
+  serialized_end=573,
+)
+
+
+_USBATCHREQUEST = _descriptor.Descriptor(
+  name='USBatchRequest',
+  full_name='USBatchRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='requests', full_name='USBatchRequest.requests', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=575,
+  serialized_end=621,
+)
+
+
+_USBATCHRESPONSE = _descriptor.Descriptor(
+  name='USBatchResponse',
+  full_name='USBatchResponse',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='responses', full_name='USBatchResponse.responses', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=623,
+  serialized_end=672,
+)
+
+
+_METRICSREQUEST = _descriptor.Descriptor(
+  name='MetricsRequest',
+  full_name='MetricsRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=674,
+  serialized_end=690,
+)
+
+
+_METRICSRESPONSE = _descriptor.Descriptor(
+  name='MetricsResponse',
+  full_name='MetricsResponse',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='text', full_name='MetricsResponse.text', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
   ],
   extensions=[
   ],
@@ -98,12 +344,103 @@ _USRESPONSE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=130,
-  serialized_end=156,
+  serialized_start=692,
+  serialized_end=723,
 )
 
+
+_PROFILEREQUEST = _descriptor.Descriptor(
+  name='ProfileRequest',
+  full_name='ProfileRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='seconds', full_name='ProfileRequest.seconds', index=0,
+      number=1, type=1, cpp_type=5, label=1,
+      has_default_value=False, default_value=float(0),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='interval_ms', full_name='ProfileRequest.interval_ms', index=1,
+      number=2, type=1, cpp_type=5, label=1,
+      has_default_value=False, default_value=float(0),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=725,
+  serialized_end=779,
+)
+
+
+_PROFILERESPONSE = _descriptor.Descriptor(
+  name='ProfileResponse',
+  full_name='ProfileResponse',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='collapsed', full_name='ProfileResponse.collapsed', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='samples', full_name='ProfileResponse.samples', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=781,
+  serialized_end=834,
+)
+
+_USREQUEST.fields_by_name['max_words_per_sentence'].message_type = google_dot_protobuf_dot_wrappers__pb2._INT32VALUE
+_USREQUEST.fields_by_name['split_by_punctuation'].message_type = google_dot_protobuf_dot_wrappers__pb2._BOOLVALUE
+_USREQUEST.fields_by_name['max_total_words'].message_type = google_dot_protobuf_dot_wrappers__pb2._INT32VALUE
+_USRESPONSE.fields_by_name['offsets'].message_type = _OFFSET
+_USBATCHREQUEST.fields_by_name['requests'].message_type = _USREQUEST
+_USBATCHRESPONSE.fields_by_name['responses'].message_type = _USRESPONSE
 DESCRIPTOR.message_types_by_name['USRequest'] = _USREQUEST
+DESCRIPTOR.message_types_by_name['Offset'] = _OFFSET
 DESCRIPTOR.message_types_by_name['USResponse'] = _USRESPONSE
+DESCRIPTOR.message_types_by_name['USBatchRequest'] = _USBATCHREQUEST
+DESCRIPTOR.message_types_by_name['USBatchResponse'] = _USBATCHRESPONSE
+DESCRIPTOR.message_types_by_name['MetricsRequest'] = _METRICSREQUEST
+DESCRIPTOR.message_types_by_name['MetricsResponse'] = _METRICSRESPONSE
+DESCRIPTOR.message_types_by_name['ProfileRequest'] = _PROFILEREQUEST
+DESCRIPTOR.message_types_by_name['ProfileResponse'] = _PROFILERESPONSE
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
 USRequest = _reflection.GeneratedProtocolMessageType('USRequest', (_message.Message,), {
@@ -113,6 +450,13 @@ USRequest = _reflection.GeneratedProtocolMessageType('USRequest', (_message.Mess
   })
 _sym_db.RegisterMessage(USRequest)
 
+Offset = _reflection.GeneratedProtocolMessageType('Offset', (_message.Message,), {
+  'DESCRIPTOR' : _OFFSET,
+  '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
+  # @@protoc_insertion_point(class_scope:Offset)
+  })
+_sym_db.RegisterMessage(Offset)
+
 USResponse = _reflection.GeneratedProtocolMessageType('USResponse', (_message.Message,), {
   'DESCRIPTOR' : _USRESPONSE,
   '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
@@ -120,6 +464,48 @@ USResponse = _reflection.GeneratedProtocolMessageType('USResponse', (_message.Me
   })
 _sym_db.RegisterMessage(USResponse)
 
+USBatchRequest = _reflection.GeneratedProtocolMessageType('USBatchRequest', (_message.Message,), {
+  'DESCRIPTOR' : _USBATCHREQUEST,
+  '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
+  # @@protoc_insertion_point(class_scope:USBatchRequest)
+  })
+_sym_db.RegisterMessage(USBatchRequest)
+
+USBatchResponse = _reflection.GeneratedProtocolMessageType('USBatchResponse', (_message.Message,), {
+  'DESCRIPTOR' : _USBATCHRESPONSE,
+  '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
+  # @@protoc_insertion_point(class_scope:USBatchResponse)
+  })
+_sym_db.RegisterMessage(USBatchResponse)
+
+MetricsRequest = _reflection.GeneratedProtocolMessageType('MetricsRequest', (_message.Message,), {
+  'DESCRIPTOR' : _METRICSREQUEST,
+  '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
+  # @@protoc_insertion_point(class_scope:MetricsRequest)
+  })
+_sym_db.RegisterMessage(MetricsRequest)
+
+MetricsResponse = _reflection.GeneratedProtocolMessageType('MetricsResponse', (_message.Message,), {
+  'DESCRIPTOR' : _METRICSRESPONSE,
+  '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
+  # @@protoc_insertion_point(class_scope:MetricsResponse)
+  })
+_sym_db.RegisterMessage(MetricsResponse)
+
+ProfileRequest = _reflection.GeneratedProtocolMessageType('ProfileRequest', (_message.Message,), {
+  'DESCRIPTOR' : _PROFILEREQUEST,
+  '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
+  # @@protoc_insertion_point(class_scope:ProfileRequest)
+  })
+_sym_db.RegisterMessage(ProfileRequest)
+
+ProfileResponse = _reflection.GeneratedProtocolMessageType('ProfileResponse', (_message.Message,), {
+  'DESCRIPTOR' : _PROFILERESPONSE,
+  '__module__' : 'utterance_segmentation.rpc.utterance_segmentation_pb2'
+  # @@protoc_insertion_point(class_scope:ProfileResponse)
+  })
+_sym_db.RegisterMessage(ProfileResponse)
+
 
 
 _UTTERANCE_SEGMENTATION = _descriptor.ServiceDescriptor(
@@ -129,8 +515,8 @@ _UTTERANCE_SEGMENTATION = _descriptor.ServiceDescriptor(
   index=0,
   serialized_options=None,
   create_key=_descriptor._internal_create_key,
-  serialized_start=158,
-  serialized_end=216,
+  serialized_start=837,
+  serialized_end=1080,
   methods=[
   _descriptor.MethodDescriptor(
     name='chunk',
@@ -142,6 +528,46 @@ _UTTERANCE_SEGMENTATION = _descriptor.ServiceDescriptor(
     serialized_options=None,
     create_key=_descriptor._internal_create_key,
   ),
+  _descriptor.MethodDescriptor(
+    name='chunk_batch',
+    full_name='utterance_segmentation.chunk_batch',
+    index=1,
+    containing_service=None,
+    input_type=_USBATCHREQUEST,
+    output_type=_USBATCHRESPONSE,
+    serialized_options=None,
+    create_key=_descriptor._internal_create_key,
+  ),
+  _descriptor.MethodDescriptor(
+    name='chunk_stream',
+    full_name='utterance_segmentation.chunk_stream',
+    index=2,
+    containing_service=None,
+    input_type=_USREQUEST,
+    output_type=_USRESPONSE,
+    serialized_options=None,
+    create_key=_descriptor._internal_create_key,
+  ),
+  _descriptor.MethodDescriptor(
+    name='metrics',
+    full_name='utterance_segmentation.metrics',
+    index=3,
+    containing_service=None,
+    input_type=_METRICSREQUEST,
+    output_type=_METRICSRESPONSE,
+    serialized_options=None,
+    create_key=_descriptor._internal_create_key,
+  ),
+  _descriptor.MethodDescriptor(
+    name='profile',
+    full_name='utterance_segmentation.profile',
+    index=4,
+    containing_service=None,
+    input_type=_PROFILEREQUEST,
+    output_type=_PROFILERESPONSE,
+    serialized_options=None,
+    create_key=_descriptor._internal_create_key,
+  ),
 ])
 _sym_db.RegisterServiceDescriptor(_UTTERANCE_SEGMENTATION)
 
@@ -19,6 +19,26 @@ class utterance_segmentationStub(object):
                 request_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USRequest.SerializeToString,
                 response_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USResponse.FromString,
                 )
+        self.chunk_batch = channel.unary_unary(
+                '/utterance_segmentation/chunk_batch',
+                request_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USBatchRequest.SerializeToString,
+                response_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USBatchResponse.FromString,
+                )
+        self.chunk_stream = channel.unary_stream(
+                '/utterance_segmentation/chunk_stream',
+                request_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USRequest.SerializeToString,
+                response_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USResponse.FromString,
+                )
+        self.metrics = channel.unary_unary(
+                '/utterance_segmentation/metrics',
+                request_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.MetricsRequest.SerializeToString,
+                response_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.MetricsResponse.FromString,
+                )
+        self.profile = channel.unary_unary(
+                '/utterance_segmentation/profile',
+                request_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.ProfileRequest.SerializeToString,
+                response_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.ProfileResponse.FromString,
+                )
 
 
 class utterance_segmentationServicer(object):
@@ -30,6 +50,30 @@ class utterance_segmentationServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def chunk_batch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def chunk_stream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def metrics(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def profile(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_utterance_segmentationServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -38,6 +82,26 @@ def add_utterance_segmentationServicer_to_server(servicer, server):
                     request_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USRequest.FromString,
                     response_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USResponse.SerializeToString,
             ),
+            'chunk_batch': grpc.unary_unary_rpc_method_handler(
+                    servicer.chunk_batch,
+                    request_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USBatchRequest.FromString,
+                    response_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USBatchResponse.SerializeToString,
+            ),
+            'chunk_stream': grpc.unary_stream_rpc_method_handler(
+                    servicer.chunk_stream,
+                    request_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USRequest.FromString,
+                    response_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USResponse.SerializeToString,
+            ),
+            'metrics': grpc.unary_unary_rpc_method_handler(
+                    servicer.metrics,
+                    request_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.MetricsRequest.FromString,
+                    response_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.MetricsResponse.SerializeToString,
+            ),
+            'profile': grpc.unary_unary_rpc_method_handler(
+                    servicer.profile,
+                    request_deserializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.ProfileRequest.FromString,
+                    response_serializer=utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.ProfileResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'utterance_segmentation', rpc_method_handlers)
@@ -64,3 +128,71 @@ class utterance_segmentation(object):
             utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def chunk_batch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/utterance_segmentation/chunk_batch',
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USBatchRequest.SerializeToString,
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USBatchResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def chunk_stream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/utterance_segmentation/chunk_stream',
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USRequest.SerializeToString,
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.USResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def metrics(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/utterance_segmentation/metrics',
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.MetricsRequest.SerializeToString,
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.MetricsResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def profile(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/utterance_segmentation/profile',
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.ProfileRequest.SerializeToString,
+            utterance__segmentation_dot_rpc_dot_utterance__segmentation__pb2.ProfileResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -1,17 +1,17 @@
 import os
 import sys
+from traceback import print_exc
 
-from utterance_segmentation.chunker import Chunker
+from utterance_segmentation.chunker import PendingResult
+from utterance_segmentation.deadline import Cancelled, Deadline
+from utterance_segmentation.metrics import METRICS
+from utterance_segmentation.profiler import ProfilerBusy, profile
+from utterance_segmentation.registry import ModelLoading, create_registry
 from utterance_segmentation.rpc.utterance_segmentation_pb2_grpc import utterance_segmentationServicer as BaseServicer
 from . import AbortableRPC
 import utterance_segmentation.rpc.utterance_segmentation_pb2 as uspb2
 import grpc
-from utterance_segmentation.utils import (
-    remove_tag,
-    sentence_length,
-    seperate_on_sentence,
-    validate_ssml,
-)
+from utterance_segmentation.utils import InvalidRequest
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,34 +22,255 @@ class USServicer(BaseServicer, metaclass=AbortableRPC):
     def __init__(self, configs):
 
         self.configs = configs
-        self.chunker = Chunker(
-        self.configs["chunker_lm_path"],
-        self.configs["max_words_per_sentence"],
-        self.configs["split_by_punctuation"],
-        self.configs["max_total_words"],
-    )
+        self.models = create_registry(self.configs)
 
     def chunk(self, request: uspb2.USRequest, context):
-        if not request.segmenter_type:
-            request.segmenter_type = "lm"
-        if request.parse_ssml:
-            verdict = validate_ssml(request.text)
-            if not verdict.is_valid:
-                context.abort(grpc.StatusCode.INVALID_ARGUMENT,  verdict.reason)
-            text = remove_tag(request.text, "speak")
-            sentences = seperate_on_sentence(text)
-            results = []
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if sentence_length(sentence) > self.configs["max_words_per_sentence"]:
-                    chunks = self.chunker.run(
-                        text=sentence, segmenter_type=request.segmenter_type
-                    )
-                    results.extend(chunks)
-                else:
-                    results.append(sentence)
-            result = [chunk for chunk in results if chunk]
-        else:
-            result = self.chunker.run(request.text,segmenter_type=request.segmenter_type)
-        response = uspb2.USResponse(text=result)
+        deadline = rpc_deadline(context)
+        try:
+            with METRICS.request("grpc", "chunk", deadline):
+                response = chunk_response(self.models, request, deadline=deadline)
+        except InvalidRequest as exception:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(exception))
+        except ModelLoading as exception:
+            context.abort(grpc.StatusCode.UNAVAILABLE, str(exception))
+        except Cancelled:
+            context.abort(grpc.StatusCode.CANCELLED, "request cancelled")
         return response
+
+    def chunk_stream(self, request: uspb2.USRequest, context):
+        deadline = rpc_deadline(context)
+        try:
+            with METRICS.request("grpc", "chunk_stream", deadline):
+                chunker = request_chunker(self.models, request)
+                chunks = chunker.iter_segment(
+                    request.text,
+                    segmenter_type=request.segmenter_type or "lm",
+                    parse_ssml=request.parse_ssml,
+                    deadline=deadline,
+                    long_document=request.long_document,
+                    with_offsets=request.with_offsets,
+                )
+                for chunk in chunks:
+                    yield chunks_response(
+                        [chunk], request, strategy=deadline.strategy
+                    )
+        except InvalidRequest as exception:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(exception))
+        except ModelLoading as exception:
+            context.abort(grpc.StatusCode.UNAVAILABLE, str(exception))
+        except Cancelled:
+            context.abort(grpc.StatusCode.CANCELLED, "request cancelled")
+
+    def chunk_batch(self, request: uspb2.USBatchRequest, context):
+        deadline = rpc_deadline(context)
+        with METRICS.request("grpc", "chunk_batch", deadline):
+            responses = batch_responses(self.models, request.requests, deadline)
+        return uspb2.USBatchResponse(responses=responses)
+
+    def metrics(self, request: uspb2.MetricsRequest, context):
+        return uspb2.MetricsResponse(text=METRICS.render(self.models))
+
+    def profile(self, request: uspb2.ProfileRequest, context):
+        try:
+            return profile_response(self.configs, request)
+        except InvalidRequest as exception:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(exception))
+        except ProfilerBusy as exception:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(exception))
+
+
+def rpc_deadline(context):
+    """
+    `Deadline` of the time remaining to the client, cancelled when the RPC
+    terminates
+    """
+    deadline = Deadline(context.time_remaining())
+    context.add_callback(deadline.cancel)
+    return deadline
+
+
+def profile_response(configs, request):
+    """
+    `ProfileResponse` of a profile of the server, see `profile`
+    """
+    seconds = request.seconds or configs["profile_seconds"]
+    if request.interval_ms:
+        profiler = profile(seconds, request.interval_ms / 1000)
+    else:
+        profiler = profile(seconds)
+    return uspb2.ProfileResponse(
+        collapsed=profiler.collapsed(), samples=profiler.samples
+    )
+
+
+def request_params(request):
+    """
+    chunker parameters of `request`, `None` for the ones it does not set, see
+    `Chunker.with_params`
+    """
+    return tuple(
+        getattr(request, name).value if request.HasField(name) else None
+        for name in (
+            "max_words_per_sentence",
+            "split_by_punctuation",
+            "max_total_words",
+        )
+    )
+
+
+def request_chunker(models, request):
+    """
+    chunker of the model and the parameters of `request`, from the
+    `ModelRegistry` `models`
+    """
+    return models.get(request.model).with_params(*request_params(request))
+
+
+def chunks_response(chunks, request, **fields):
+    """
+    `USResponse` of `chunks`, along with their offsets when `request` asked
+    for them
+    """
+    if not request.with_offsets:
+        return uspb2.USResponse(text=chunks, **fields)
+    return uspb2.USResponse(
+        text=[chunk.text for chunk in chunks],
+        offsets=[uspb2.Offset(start=chunk.start, end=chunk.end) for chunk in chunks],
+        **fields
+    )
+
+
+def chunk_response(models, request, memo=None, deadline=None):
+    """
+    `USResponse` of the chunks of `request`, of a page of them for long
+    documents.
+
+    Raises `InvalidRequest` for requests that can't be chunked
+    """
+    return submit_response(models, request, memo, deadline).get()
+
+
+def submit_response(models, request, memo=None, deadline=None):
+    """
+    `chunk_response` as a `PendingResult`, submitted right away to the
+    workers of a `ChunkerPool`.
+
+    Raises `InvalidRequest` for requests that can't be chunked, or else when
+    its result is asked for
+    """
+    if deadline is None:
+        deadline = Deadline()
+    segmenter_type = request.segmenter_type or "lm"
+    chunker = request_chunker(models, request)
+
+    if not request.long_document:
+        pending = chunker.segment_async(
+            request.text,
+            segmenter_type,
+            request.parse_ssml,
+            memo,
+            deadline,
+            with_offsets=request.with_offsets,
+        )
+
+        def response():
+            result = pending.get()
+            return chunks_response(result, request, strategy=deadline.strategy)
+
+        return PendingResult(response, pending.cancel)
+
+    if request.parse_ssml:
+        raise InvalidRequest("long SSML documents can only be streamed")
+    pending = chunker.segment_page_async(
+        request.text,
+        request.offset,
+        segmenter_type,
+        memo,
+        deadline,
+        with_offsets=request.with_offsets,
+    )
+
+    def page_response():
+        result, next_offset = pending.get()
+        return chunks_response(
+            result, request, strategy=deadline.strategy, next_offset=next_offset
+        )
+
+    return PendingResult(page_response, pending.cancel)
+
+
+def error_response(exception):
+    """
+    `USResponse` of the status of a request that raised `exception`, to be
+    called while handling it
+    """
+    if isinstance(exception, InvalidRequest):
+        return uspb2.USResponse(
+            status=grpc.StatusCode.INVALID_ARGUMENT.name, reason=str(exception)
+        )
+    if isinstance(exception, ModelLoading):
+        return uspb2.USResponse(
+            status=grpc.StatusCode.UNAVAILABLE.name, reason=str(exception)
+        )
+    print_exc()
+    return uspb2.USResponse(
+        status=grpc.StatusCode.INTERNAL.name,
+        reason="server got itself in trouble",
+    )
+
+
+def batch_responses(models, requests, deadline=None):
+    """
+    one `USResponse` per request with its own status, all requests share the
+    time budget of `deadline` and the batch stops once it is cancelled.
+
+    Every request is submitted before waiting for any, so the workers of a
+    `ChunkerPool` chunk the batch at once
+    """
+    if deadline is None:
+        deadline = Deadline()
+    # Words are normalized once for the whole batch and repeated items
+    # are only chunked once
+    memo = {}
+    keys = []
+    pending = {}
+    responses = {}
+    try:
+        for item in requests:
+            if deadline.cancelled:
+                break
+            key = (
+                item.text,
+                item.segmenter_type or "lm",
+                item.parse_ssml,
+                item.long_document,
+                item.offset,
+                item.with_offsets,
+                item.model,
+                *request_params(item)
+            )
+            keys.append(key)
+            if key not in pending and key not in responses:
+                try:
+                    pending[key] = submit_response(models, item, memo, deadline)
+                except Exception as exception:
+                    responses[key] = error_response(exception)
+
+        batch = []
+        for key in keys:
+            if deadline.cancelled:
+                break
+            if key not in responses:
+                try:
+                    responses[key] = pending[key].get()
+                    responses[key].status = grpc.StatusCode.OK.name
+                except Cancelled:
+                    break
+                except Exception as exception:
+                    responses[key] = error_response(exception)
+            batch.append(responses[key])
+        return batch
+    finally:
+        # Workers stop chunking requests left behind by a cancelled batch
+        for result in pending.values():
+            result.cancel()
@@ -1,6 +1,7 @@
 import json
 
 import requests
+from config import config
 from micro_service.micro_service_test_class import MicroServiceTestClass
 from utterance_segmentation.api import chunker_service
 
@@ -98,6 +99,60 @@ class ChunkerTest(MicroServiceTestClass):
         result = response.json()["results"]
         self.assertEqual(result, self.test_cases["lm"]["output"])
 
+    def test_chunker_params(self):
+        """
+        requests can set their own chunker parameters, up to the configured
+        ones
+        """
+
+        response = requests.post(
+            self.link_chunker,
+            json={
+                "text": self.test_cases["lm"]["input"],
+                "max_words_per_sentence": 3,
+                "max_total_words": 20,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        result = response.json()["results"]
+        self.assertTrue(all(len(chunk.split()) <= 3 for chunk in result))
+        self.assertLessEqual(len(" ".join(result).split()), 20)
+
+        response = requests.post(
+            self.link_chunker,
+            params={
+                "text": self.test_cases["lm"]["input"],
+                "split_by_punctuation": False,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+        for params in (
+            {"max_words_per_sentence": 0},
+            {"max_total_words": -1},
+            {"max_words_per_sentence": config["max_words_per_sentence"] + 1},
+            {"max_total_words": config["max_total_words"] + 1},
+        ):
+            response = requests.post(
+                self.link_chunker,
+                json=dict(params, text=self.test_cases["lm"]["input"]),
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_metrics(self):
+        """
+        test that requests are counted in the metrics
+        """
+
+        requests.post(self.link_chunker, json={"text": self.test_cases["lm"]["input"]})
+        response = requests.get(self.link_chunker.replace("chunker", "metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'chunker_request_seconds_count{transport="http",method="chunker"}',
+            response.text,
+        )
+
     def test_ssml(self):
         """
         test SSML support
@@ -0,0 +1,353 @@
+import json
+import os
+import random
+import re
+import tempfile
+import timeit
+import unittest
+from xml.etree import ElementTree as ET
+from xml.sax.saxutils import escape
+
+from arabic_analysis import arabic as ar
+from config import config
+from utterance_segmentation import benchmark, chunker
+from utterance_segmentation.chunker import Chunker
+from utterance_segmentation.utils import InvalidSSML, sentence_length, split_ssml
+
+# Timing comparisons depend on the load of the machine, they only run when
+# asked for
+TIMING_BENCHMARKS = bool(os.environ.get("TIMING_BENCHMARKS"))
+
+
+class Benchmark(unittest.TestCase):
+    with open("utterance_segmentation/tests/test_cases.json") as f:
+        test_cases = json.load(f)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.chunker = Chunker(
+            config["chunker_lm_path"],
+            config["max_words_per_sentence"],
+            config["split_by_punctuation"],
+            config["max_total_words"],
+        )
+
+        # long input mixing Arabic, Latin, digits, punctuation, Tashkeel
+        # and Tatweel
+        rng = random.Random(0)
+        words = " ".join(
+            case["input"] for case in cls.test_cases.values() if "input" in case
+        ).split()
+        words += ["مُحَمَّد", "كـــتاب", "abc", "123", "،", "(test)", "x-y", "x،y"]
+        cls.long_text = " ".join(rng.choice(words) for _ in range(20000))
+
+    def assert_faster(self, old, new, factor=1, what="new"):
+        """
+        Assert `new()` takes less than `factor` times as long as `old()`,
+        the best of a few runs of each. Skipped unless TIMING_BENCHMARKS is
+        set
+        """
+        if not TIMING_BENCHMARKS:
+            self.skipTest("set TIMING_BENCHMARKS=1 to compare timings")
+        before = min(timeit.repeat(old, number=3, repeat=3)) / 3
+        after = min(timeit.repeat(new, number=3, repeat=3)) / 3
+        self.assertLess(
+            after,
+            before * factor,
+            "{}: {:.2f}ms, before {:.2f}ms".format(what, after * 1000, before * 1000),
+        )
+
+
+class NormalizationBenchmark(Benchmark):
+    def filter_per_character(self, text):
+        """
+        the filter `Chunker` used before the precompiled patterns
+        """
+
+        normalized = ar.normalize_encoding(text, normalize_combined=True)
+        normalized = normalized.translate(chunker.TASHKEEL_TATWEEL_DICT)
+        ar_chars = chunker.AR_CHARS
+        return re.sub(
+            " +", " ", "".join([ch if ch in ar_chars else " " for ch in normalized])
+        )
+
+    def test_filter_patterns(self):
+        """
+        the precompiled patterns give identical output, whatever the
+        characters
+        """
+
+        normalize = self.chunker._Chunker__normalize
+        every_character = "".join(
+            chr(ch) for ch in range(0x110000) if not 0xD800 <= ch < 0xE000
+        )
+
+        self.assertEqual(
+            normalize(self.long_text), self.filter_per_character(self.long_text)
+        )
+        self.assertEqual(
+            normalize(every_character), self.filter_per_character(every_character)
+        )
+
+    def test_filter_patterns_timing(self):
+        """
+        the precompiled patterns are faster on long inputs
+        """
+
+        normalize = self.chunker._Chunker__normalize
+        self.assert_faster(
+            lambda: self.filter_per_character(self.long_text),
+            lambda: normalize(self.long_text),
+            what="normalize {} chars with patterns".format(len(self.long_text)),
+        )
+
+
+class TokenizerBenchmark(Benchmark):
+    def split_per_character(self, text):
+        """
+        the punctuation splitter `Chunker` used before the tokenizer, words
+        of every piece of text
+        """
+
+        chunk = ""
+        for ch in text:
+            chunk += ch
+            if ch in ar.ARABIC_PUNC:
+                yield chunk.strip().split()
+                chunk = ""
+        if len(chunk) > 0:
+            yield chunk.split()
+
+    def split_tokens(self, text):
+        piece = []
+        for token in self.chunker.tokenize(text):
+            piece.append(token.word)
+            if token.punc:
+                yield piece
+                piece = []
+        yield piece
+
+    def test_tokenizer(self):
+        """
+        the tokenizer splits words the same as the splitter it replaced
+        """
+
+        self.assertEqual(
+            [words for words in self.split_per_character(self.long_text) if words],
+            [words for words in self.split_tokens(self.long_text) if words],
+        )
+
+    def test_capped_run(self):
+        """
+        texts are only chunked up to the first `max_total_words` words
+        """
+
+        longer_text = " ".join([self.long_text] * 10)
+        self.assertEqual(
+            self.chunker.run(self.long_text, "max"),
+            self.chunker.run(longer_text, "max"),
+        )
+
+    def test_capped_run_timing(self):
+        """
+        texts are only tokenized up to the words in use, so chunking the
+        first `max_total_words` words costs the same for any text length
+        """
+
+        longer_text = " ".join([self.long_text] * 10)
+        self.assert_faster(
+            lambda: self.chunker.run(self.long_text, "max"),
+            lambda: self.chunker.run(longer_text, "max"),
+            factor=3,
+            what="run {} chars, before {} chars".format(
+                len(longer_text), len(self.long_text)
+            ),
+        )
+
+
+class SSMLBenchmark(Benchmark):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        # long SSML document of every sentence tag
+        rng = random.Random(0)
+        words = cls.long_text.split()
+        parts = []
+        for i in range(2000):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(1, 20)))
+            parts.append(
+                rng.choice(
+                    [
+                        "<p><s>{0}</s>{0}</p>",
+                        '<break time="1s"/>{0}',
+                        '<prosody rate="slow"><s>{0}</s></prosody>',
+                        "{0}&amp;<emphasis>{0}</emphasis>",
+                    ]
+                ).format(escape(sentence))
+            )
+        cls.long_ssml = "<speak>{}</speak>".format("".join(parts))
+
+    def split_per_tree(self, text):
+        """
+        the validation and splitting `Chunker` used before the single pass
+        parser, sentences and their lengths
+        """
+
+        root = ET.fromstring(text)
+        rules = [
+            len(root.findall(".//break")) == len(root.findall("break")),
+            len(root.findall(".//prosody")) == len(root.findall("prosody")),
+            all(len(i) == 0 for i in root.findall(".//s")),
+            all(c.tag in {"s"} for i in root.findall(".//p") for c in i),
+            all(c.tag in {"s", "p"} for i in root.findall(".//prosody") for c in i),
+        ]
+        if not all(rules):
+            raise InvalidSSML(rules.index(False))
+
+        def remove_tag(text, tag):
+            return re.sub(r"<{0}>|</{0}>".format(tag), "", text)
+
+        text = remove_tag(text, "speak")
+        text = re.sub(r"(<break[^>]*>[^>]*</break>|<break[^>]*>)", r"<s>\1</s>", text)
+        text = re.sub(r"(<prosody[^>]*>|</prosody>)", r"<s>\1</s>", text)
+        text = re.sub(r"(<p>|</p>|<s>|</s>)", r"\1~~", text)
+
+        puns = "".join(ar.ARABIC_PUNC | ar.ENGLISH_PUNC)
+        sentences = []
+        for chunk in re.split("~~", text):
+            sentence = remove_tag(remove_tag(chunk, "s"), "p").strip()
+            pattern = r"[{}\s]+".format(re.escape(puns))
+            sentences.append((sentence, len(re.split(pattern, sentence))))
+        return sentences
+
+    def split_single_pass(self, text):
+        sentences = []
+        for sentence in split_ssml(text):
+            sentence = sentence.strip()
+            sentences.append((sentence, sentence_length(sentence)))
+        return sentences
+
+    def test_single_pass(self):
+        """
+        the single pass parser splits SSML the same as the tree it replaced
+        """
+
+        for case in [self.test_cases["ssml"]] + self.test_cases["ssml_validation"]:
+            try:
+                expected = self.split_per_tree(case["input"])
+            except (ET.ParseError, InvalidSSML):
+                with self.assertRaises(InvalidSSML) as raised:
+                    split_ssml(case["input"])
+                self.assertEqual(str(raised.exception), case["output"])
+            else:
+                self.assertEqual(self.split_single_pass(case["input"]), expected)
+
+        self.assertEqual(
+            self.split_single_pass(self.long_ssml), self.split_per_tree(self.long_ssml)
+        )
+
+    def test_single_pass_timing(self):
+        """
+        the single pass parser is faster on long documents
+        """
+
+        self.assert_faster(
+            lambda: self.split_per_tree(self.long_ssml),
+            lambda: self.split_single_pass(self.long_ssml),
+            what="split {} chars of SSML in a single pass".format(len(self.long_ssml)),
+        )
+
+
+class PatternBenchmark(Benchmark):
+    def finish_per_call(self, sentence):
+        """
+        the punctuation cleanup and sentence length `Chunker` used before
+        the precompiled patterns, building them for every sentence
+        """
+
+        puncs = re.escape(
+            "".join(list(ar.ARABIC_PUNC) + ["?", ";", "-", "\n", "@", "#", "$", "="])
+        )
+        sentence = re.sub(r"([%s])[%s]+" % (puncs, puncs + " "), r" \1 ", sentence)
+        sentence = re.sub(" +", " ", sentence)
+
+        puns = "".join(ar.ARABIC_PUNC | ar.ENGLISH_PUNC)
+        pattern = r"[{}\s]+".format(re.escape(puns))
+        return sentence, len(re.split(pattern, sentence))
+
+    def finish_precompiled(self, sentence):
+        sentence = chunker.REPEATED_PUNCS_PATTERN.sub(r" \1 ", sentence)
+        sentence = chunker.SPACES_PATTERN.sub(" ", sentence)
+        return sentence, sentence_length(sentence)
+
+    def sentences(self):
+        rng = random.Random(0)
+        words = self.long_text.split() + ["،،", "..", "؟!", "- -"]
+        return [
+            " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+            for _ in range(1000)
+        ]
+
+    def test_precompiled_patterns(self):
+        """
+        precompiled patterns give identical output
+        """
+
+        sentences = self.sentences()
+        self.assertEqual(
+            [self.finish_per_call(sentence) for sentence in sentences],
+            [self.finish_precompiled(sentence) for sentence in sentences],
+        )
+
+    def test_precompiled_patterns_timing(self):
+        """
+        precompiled patterns cut the per sentence overhead of short requests
+        """
+
+        sentences = self.sentences()
+        self.assert_faster(
+            lambda: [self.finish_per_call(sentence) for sentence in sentences],
+            lambda: [self.finish_precompiled(sentence) for sentence in sentences],
+            what="finish {} short sentences precompiled".format(len(sentences)),
+        )
+
+
+class BenchmarkSuite(unittest.TestCase):
+    def test_suites(self):
+        with tempfile.TemporaryDirectory() as directory:
+            suite = benchmark.Benchmark(directory, [10, 100], 2, 2, 10, 0)
+            results = suite.run(["chunker", "ssml"])
+
+        self.assertEqual(set(results["suites"]), {"chunker", "ssml"})
+        self.assertEqual(len(results["suites"]["chunker"]["results"]), 4)
+        self.assertEqual(len(results["suites"]["ssml"]["results"]), 2)
+        for suite in results["suites"].values():
+            self.assertGreater(suite["peak_rss_mb"], 0)
+            for result in suite["results"]:
+                self.assertEqual(result["requests"], 2)
+                self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    def test_startup(self):
+        """
+        gRPC servers import neither Flask nor micro_service
+        """
+
+        times = benchmark.import_times(benchmark.TRANSPORT_MODULES["grpc"])
+        for module in benchmark.UNNEEDED_MODULES["grpc"]:
+            self.assertNotIn(module, times)
+
+        times = benchmark.import_times("utterance_segmentation.api")
+        self.assertNotIn("grpc", times)
+        self.assertNotIn("flask", times)
+
+    def test_generated_corpus(self):
+        # the same seed gives the same corpus
+        texts = []
+        for _ in range(2):
+            rng = random.Random(0)
+            vocabulary = benchmark.generate_vocabulary(100, rng)
+            sentences = benchmark.generate_sentences(vocabulary, 1000, rng)
+            texts.append(benchmark.generate_text(sentences, rng))
+        self.assertEqual(texts[0], texts[1])
+        self.assertEqual(sum(map(len, sentences)), 1000)
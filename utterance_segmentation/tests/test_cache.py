@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+
+from utterance_segmentation.cache import LRUCache, digest
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_eviction(self):
+        """
+        least recently used items are evicted first
+        """
+
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(
+            cache.stats(),
+            {
+                "size": 2,
+                "weight": 2,
+                "capacity": 2,
+                "hits": 3,
+                "misses": 1,
+                "evictions": 1,
+            },
+        )
+
+    def test_weight(self):
+        """
+        items are evicted until the total weight fits the capacity
+        """
+
+        cache = LRUCache(10, weigh=len)
+        cache.put("a", "xxxx")
+        cache.put("b", "xxxx")
+        cache.put("c", "xxxx")
+        cache.put("d", "x" * 11)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("d"))
+        self.assertEqual(cache.weight, 8)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_ttl(self):
+
+        cache = LRUCache(10, ttl=0.05)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_digest(self):
+
+        self.assertEqual(len(digest("x" * 100000, "lm", True)), 16)
+        self.assertEqual(digest("text", "lm", True), digest("text", "lm", True))
+        self.assertNotEqual(digest("text", "lm", True), digest("text", "lm", False))
+        self.assertNotEqual(digest("ab", "c"), digest("a", "bc"))
+
+    def test_disabled(self):
+
+        cache = LRUCache(0)
+        cache.put("a", 1)
+
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get("a"))
+
+    def test_threads(self):
+        """
+        the cache stays bounded and consistent under concurrent use
+        """
+
+        cache = LRUCache(50)
+
+        def work(offset):
+            for i in range(2000):
+                key = (offset + i) % 100
+                if cache.get(key) is None:
+                    cache.put(key, key)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        self.assertEqual(stats["size"], 50)
+        self.assertEqual(stats["hits"] + stats["misses"], 20000)
@@ -0,0 +1,409 @@
+import json
+import os
+import tempfile
+import unittest
+
+from config import config
+from utterance_segmentation.chunker import Chunker, load_language_model
+from utterance_segmentation.deadline import Cancelled, Deadline
+from utterance_segmentation.utils import InvalidRequest, InvalidSSML
+
+
+class ChunkerTest(unittest.TestCase):
+    with open("utterance_segmentation/tests/test_cases.json") as f:
+        test_cases = json.load(f)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.chunker = Chunker(
+            config["chunker_lm_path"],
+            config["max_words_per_sentence"],
+            config["split_by_punctuation"],
+            config["max_total_words"],
+            config["span_cache_size"],
+            config["result_cache_mb"] * 2 ** 20,
+        )
+
+    def test_normalize_words(self):
+        """
+        words can normalize to several tokens or to none at all
+        """
+
+        word = self.test_cases["lm"]["input"].split()[0]
+        (token,) = self.chunker.normalize_words([word]).tokens
+        normalized = self.chunker.normalize_words(
+            ["abc", word, "{0}({0})".format(word), "123"]
+        )
+
+        self.assertEqual(list(normalized.bounds), [0, 0, 1, 3, 3])
+        self.assertEqual(normalized.tokens, [token, token, token])
+
+    def test_tokenize(self):
+        """
+        tokens are split after punctuation and keep their offsets
+        """
+
+        text = "x،y  ab ، c"
+        tokens = list(self.chunker.tokenize(text))
+
+        self.assertEqual([token.word for token in tokens], ["x،", "y", "ab", "،", "c"])
+        self.assertEqual([token.punc for token in tokens], ["،", "", "", "،", ""])
+        for token in tokens:
+            self.assertTrue(text.startswith(token.word, token.offset))
+
+    def test_span_scores(self):
+        """
+        incremental span scores are exactly the scores of the joined spans
+        """
+
+        words = self.test_cases["lm"]["input"].split()
+        spans = self.chunker._Chunker__span_scores(
+            self.chunker.normalize_words(words)
+        )
+
+        self.assertEqual(len(spans), len(words))
+        for i, row in enumerate(spans):
+            for j, span_score in enumerate(row):
+                self.assertEqual(
+                    span_score, self.chunker.score(words[i: i + j + 1])
+                )
+
+    def test_run_lm(self):
+
+        result = self.chunker.run(self.test_cases["lm"]["input"], "lm")
+        self.assertEqual(result, self.test_cases["lm"]["output"])
+
+    def test_run_max(self):
+
+        result = self.chunker.run(self.test_cases["max"]["input"], "max")
+        self.assertEqual(result, self.test_cases["max"]["output"])
+
+    def test_span_cache(self):
+        """
+        repeated texts reuse cached span scores and chunk the same
+        """
+
+        self.chunker.span_cache.clear()
+        text = self.test_cases["lm"]["input"]
+
+        first = self.chunker.run(text, "lm")
+        hits = self.chunker.span_cache.stats()["hits"]
+        second = self.chunker.run(text, "lm")
+
+        self.assertEqual(first, second)
+        self.assertGreater(self.chunker.span_cache.stats()["hits"], hits)
+
+    def test_result_cache(self):
+        """
+        repeated requests are answered from the result cache
+        """
+
+        text = self.test_cases["ssml"]["input"]
+
+        first = self.chunker.segment(text, "lm", parse_ssml=True)
+        hits = self.chunker.result_cache.hits
+        second = self.chunker.segment(text, "lm", parse_ssml=True)
+
+        self.assertEqual(first, self.test_cases["ssml"]["output"])
+        self.assertEqual(first, second)
+        self.assertEqual(self.chunker.result_cache.hits, hits + 1)
+        # the same text without SSML parsing is a different request
+        self.assertNotEqual(
+            self.chunker.segment(text, "lm", parse_ssml=False), first
+        )
+
+    def test_lm_window(self):
+        """
+        the windowed chunker matches the exact one and keeps chunks valid
+        when bounded by a beam
+        """
+
+        words = self.test_cases["lm"]["input"].split() * 20
+        chunk = self.chunker._Chunker__lm_chunk_utterance
+
+        exact = list(chunk(words))
+        self.assertEqual(sum(exact, []), words)
+        try:
+            self.chunker.lm_window = config["lm_window"]
+            self.assertEqual(list(chunk(words)), exact)
+
+            self.chunker.lm_beam = 2
+            beamed = list(chunk(words))
+            self.assertEqual(sum(beamed, []), words)
+            self.assertTrue(
+                all(len(c) <= self.chunker.max_words for c in beamed)
+            )
+        finally:
+            self.chunker.lm_window = self.chunker.lm_beam = 0
+
+    def test_no_convergence(self):
+        """
+        words the language model can't tell apart never converge to a single
+        segmentation, the windowed chunker still bounds its states
+        """
+
+        words = ["abc"] * 20000
+        chunk = self.chunker._Chunker__lm_chunk_utterance
+
+        for lm_window in (0, config["lm_window"]):
+            deadline = Deadline()
+            try:
+                self.chunker.lm_window = lm_window
+                chunks = list(chunk(words, deadline=deadline))
+            finally:
+                self.chunker.lm_window = 0
+            self.assertEqual(sum(chunks, []), words)
+            self.assertTrue(all(len(c) <= self.chunker.max_words for c in chunks))
+        self.assertLessEqual(deadline.stats.dp_states, config["lm_window"] + 1)
+
+    def test_long_document(self):
+        """
+        long documents are chunked whole, in pages of at most
+        `max_total_words` words
+        """
+
+        text = " ".join([self.test_cases["lm"]["input"]] * 20)
+        chunks = list(self.chunker.iter_segment(text, long_document=True))
+
+        self.assertLess(len(self.chunker.segment(text)), len(chunks))
+        self.assertTrue(chunks[-1].endswith(text.split()[-1]))
+
+        pages = []
+        offset = 0
+        while True:
+            page, offset = self.chunker.segment_page(text, offset)
+            self.assertLessEqual(
+                len(" ".join(page).split()), self.chunker.max_total_words
+            )
+            pages.extend(page)
+            if not offset:
+                break
+        self.assertEqual(pages, chunks)
+
+        with self.assertRaises(InvalidRequest):
+            self.chunker.segment_page(text, len(text) + 1)
+
+    def test_page_cost(self):
+        """
+        a page takes the same words to chunk whatever the length of the
+        document, punctuated or not
+        """
+
+        text = self.test_cases["lm"]["input"]
+        unpunctuated = self.chunker.with_params(split_by_punctuation=False)
+        for chunker in (self.chunker, unpunctuated):
+            for segmenter_type in ("lm", "max"):
+                words = []
+                for repeats in (20, 200):
+                    deadline = Deadline()
+                    chunker.segment_page(
+                        " ".join([text] * repeats), 0, segmenter_type, deadline=deadline
+                    )
+                    words.append(deadline.stats.words)
+                self.assertEqual(words[0], words[1])
+
+    def test_offsets(self):
+        """
+        chunks are the words of the text at their offsets, pages included
+        """
+
+        text = " ".join([self.test_cases["lm"]["input"]] * 20)
+        for segmenter_type in ("lm", "max"):
+            chunks = self.chunker.segment(text, segmenter_type, with_offsets=True)
+            self.assertEqual(
+                [chunk.text for chunk in chunks],
+                self.chunker.segment(text, segmenter_type),
+            )
+            for chunk in chunks:
+                self.assertEqual(
+                    text[chunk.start : chunk.end].split(), chunk.text.split()
+                )
+
+        page, offset = self.chunker.segment_page(text, with_offsets=True)
+        next_page, _ = self.chunker.segment_page(text, offset, with_offsets=True)
+        for chunk in page + next_page:
+            self.assertEqual(text[chunk.start : chunk.end].split(), chunk.text.split())
+        self.assertLessEqual(page[-1].end, offset)
+        self.assertEqual(next_page[0].start, offset)
+
+        with self.assertRaises(InvalidRequest):
+            self.chunker.segment(text, parse_ssml=True, with_offsets=True)
+
+        # Offsets count code points, characters outside the BMP included
+        (chunk,) = self.chunker.segment(
+            "\U0001f600 " + text.split()[0], with_offsets=True
+        )
+        self.assertEqual((chunk.start, chunk.end), (0, 2 + len(text.split()[0])))
+
+    def test_with_params(self):
+        """
+        per request parameters change the chunks, not the chunker they are
+        taken from, and share its model and caches
+        """
+
+        text = " ".join([self.test_cases["lm"]["input"]] * 5)
+        self.assertIs(self.chunker.with_params(), self.chunker)
+
+        chunker = self.chunker.with_params(
+            max_words_per_sentence=3, max_total_words=20
+        )
+        self.assertIs(chunker.language_model, self.chunker.language_model)
+        self.assertIs(chunker.result_cache, self.chunker.result_cache)
+        for segmenter_type in ("lm", "max"):
+            chunks = chunker.segment(text, segmenter_type)
+            self.assertTrue(all(len(chunk.split()) <= 3 for chunk in chunks))
+            self.assertLessEqual(len(" ".join(chunks).split()), 20)
+            self.assertNotEqual(chunks, self.chunker.segment(text, segmenter_type))
+        self.assertEqual(self.chunker.max_words, config["max_words_per_sentence"])
+
+        # Requests can't chunk at a higher cost than the configured one
+        for params in (
+            {"max_words_per_sentence": 0},
+            {"max_total_words": -1},
+            {"max_words_per_sentence": config["max_words_per_sentence"] + 1},
+            {"max_total_words": config["max_total_words"] + 1},
+        ):
+            with self.assertRaises(InvalidRequest):
+                self.chunker.with_params(**params)
+            with self.assertRaises(InvalidRequest):
+                chunker.with_params(**params)
+
+        # Unless the chunker was created with higher limits
+        limited = Chunker(
+            config["chunker_lm_path"],
+            config["max_words_per_sentence"],
+            config["split_by_punctuation"],
+            config["max_total_words"],
+            max_words_per_sentence_limit=config["max_words_per_sentence"] + 1,
+            max_total_words_limit=config["max_total_words"] + 1,
+        )
+        chunker = limited.with_params(
+            max_words_per_sentence=config["max_words_per_sentence"] + 1,
+            max_total_words=config["max_total_words"] + 1,
+        )
+        self.assertEqual(chunker.max_words, config["max_words_per_sentence"] + 1)
+        self.assertEqual(limited.max_words, config["max_words_per_sentence"])
+        with self.assertRaises(InvalidRequest):
+            limited.with_params(max_total_words=config["max_total_words"] + 2)
+        with self.assertRaises(ValueError):
+            Chunker(
+                config["chunker_lm_path"],
+                config["max_words_per_sentence"],
+                config["split_by_punctuation"],
+                config["max_total_words"],
+                max_total_words_limit=config["max_total_words"] - 1,
+            )
+
+    def test_request_stats(self):
+        """
+        chunking records what it took in the stats of the deadline
+        """
+
+        words = " ".join([self.test_cases["lm"]["input"]] * 7).split()
+        text = " ".join(words[: config["max_total_words"] - 1])
+        # Chunks the whole text, and misses the result cache
+        chunker = self.chunker.with_params(max_total_words=len(text.split()))
+        deadline = Deadline()
+        chunker.segment(text, "lm", deadline=deadline)
+
+        stats = deadline.stats
+        self.assertEqual(stats.words, len(text.split()))
+        self.assertGreater(stats.dp_states, 0)
+        # Spans are scored unless cached
+        self.assertGreater(stats.cache_hits["span"] + stats.cache_misses["span"], 0)
+        self.assertEqual(stats.lm_calls > 0, stats.cache_misses["span"] > 0)
+        self.assertTrue({"normalize", "lm_scoring", "lm_search"} <= set(stats.stages))
+        self.assertEqual(stats.cache_misses["result"], 1)
+
+        # Answered from the result cache
+        deadline = Deadline()
+        chunker.segment(text, "lm", deadline=deadline)
+        self.assertEqual(deadline.stats.words, 0)
+        self.assertEqual(deadline.stats.cache_hits["result"], 1)
+
+        deadline = Deadline()
+        chunker.segment(
+            "<speak><s>{}</s></speak>".format(text), parse_ssml=True, deadline=deadline
+        )
+        self.assertIn("ssml", deadline.stats.stages)
+        self.assertEqual(deadline.stats.words, len(text.split()))
+
+    def test_deadline(self):
+        """
+        the language model is skipped when the time budget is too short
+        """
+
+        text = self.test_cases["lm"]["input"]
+        deadline = Deadline()
+        self.chunker.segment(text, "lm", deadline=deadline)
+        self.assertEqual(deadline.strategy, "lm")
+
+        deadline = Deadline(0)
+        result = self.chunker.segment(text + " ", "lm", deadline=deadline)
+        self.assertEqual(deadline.strategy, "max")
+        self.assertEqual(result, self.chunker.run(text, "max"))
+        # degraded results are not cached
+        self.chunker.segment(text + " ", "lm", deadline=deadline)
+        self.assertEqual(deadline.strategy, "max")
+
+    def test_deadline_capped(self):
+        """
+        only the words kept are priced, a long text the budget can't chunk
+        whole still uses the language model for its first words
+        """
+
+        text = " ".join([self.test_cases["lm"]["input"]] * 2000)
+        n_words = len(text.split())
+        capped = self.chunker.max_total_words + self.chunker.max_words
+        self.assertLess(capped * 100, n_words)
+
+        deadline = Deadline(self.chunker.lm_seconds(n_words) / 2)
+        self.chunker.segment(text + "  ", "lm", deadline=deadline)
+        self.assertEqual(deadline.strategy, "lm")
+
+    def test_cancelled(self):
+
+        deadline = Deadline()
+        deadline.cancel()
+        with self.assertRaises(Cancelled):
+            self.chunker.segment(self.test_cases["lm"]["input"], deadline=deadline)
+
+    def test_invalid_ssml(self):
+
+        for test_case in self.test_cases["ssml_validation"]:
+            with self.assertRaises(InvalidSSML) as raised:
+                self.chunker.segment(test_case["input"], "lm", parse_ssml=True)
+            self.assertEqual(str(raised.exception), test_case["output"])
+
+    def test_arpa_warning(self):
+        """
+        loading an ARPA model warns that it can not be shared
+        """
+
+        arpa = "\n".join(
+            [
+                "\\data\\",
+                "ngram 1=3",
+                "ngram 2=1",
+                "",
+                "\\1-grams:",
+                "-1.0\t<unk>\t0",
+                "-99\t<s>\t0",
+                "-1.0\t</s>",
+                "",
+                "\\2-grams:",
+                "-0.5\t<s> </s>",
+                "",
+                "\\end\\",
+                "",
+            ]
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lm.arpa")
+            with open(path, "w") as f:
+                f.write(arpa)
+
+            with self.assertLogs("utterance_segmentation.chunker", "WARNING"):
+                model = load_language_model(path)
+
+        self.assertEqual(model.order, 2)
@@ -0,0 +1,92 @@
+import pickle
+import unittest
+
+from utterance_segmentation.cache import LRUCache
+from utterance_segmentation.deadline import Deadline
+from utterance_segmentation.metrics import Histogram, Metrics, RequestStats
+
+
+class HistogramTest(unittest.TestCase):
+    def test_render(self):
+        """
+        buckets are cumulative and values on a bound fall in its bucket
+        """
+
+        histogram = Histogram("seconds", "Seconds", (1, 2), ("method",))
+        for value in (0.5, 1, 1.5, 3):
+            histogram.observe(value, "chunk")
+
+        self.assertEqual(histogram.count("chunk"), 4)
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP seconds Seconds",
+                "# TYPE seconds histogram",
+                'seconds_bucket{method="chunk",le="1"} 2',
+                'seconds_bucket{method="chunk",le="2"} 3',
+                'seconds_bucket{method="chunk",le="+Inf"} 4',
+                'seconds_sum{method="chunk"} 6.0',
+                'seconds_count{method="chunk"} 4',
+            ],
+        )
+
+
+class MetricsTest(unittest.TestCase):
+    def test_request(self):
+        """
+        requests are observed along with what chunking them took, even when
+        they fail
+        """
+
+        metrics = Metrics()
+        deadline = Deadline()
+        with self.assertRaises(ValueError):
+            with metrics.request("grpc", "chunk", deadline):
+                deadline.stats.add("ssml", 0.002)
+                deadline.stats.words = 20
+                deadline.stats.lm_calls = 300
+                raise ValueError()
+
+        self.assertEqual(metrics.request_seconds.count("grpc", "chunk"), 1)
+        self.assertEqual(metrics.stage_seconds.count("ssml"), 1)
+        self.assertEqual(metrics.lm_calls.count(), 1)
+
+        text = metrics.render()
+        self.assertIn('chunker_stage_seconds_bucket{stage="ssml",le="0.0025"} 1', text)
+        self.assertIn('chunker_lm_calls_bucket{le="300"} 1', text)
+        self.assertIn('chunker_cache_hits_total{cache="result"} 0', text)
+
+    def test_cache_lookups(self):
+        """
+        lookups are only counted when caching is enabled
+        """
+
+        stats = RequestStats()
+        cache = LRUCache(1)
+        cache.put("a", 1)
+        self.assertEqual(stats.lookup("result", cache, "a"), 1)
+        self.assertIsNone(stats.lookup("result", cache, "b"))
+        self.assertIsNone(stats.lookup("span", LRUCache(0), "a"))
+
+        self.assertEqual(stats.cache_hits, {"span": 0, "result": 1})
+        self.assertEqual(stats.cache_misses, {"span": 0, "result": 1})
+
+    def test_merge(self):
+        """
+        stats of worker processes add up with the ones of the request
+        """
+
+        stats = RequestStats()
+        stats.add("lm_scoring", 1.0)
+        stats.dp_states = 10
+        worker = RequestStats()
+        worker.add("lm_scoring", 0.5)
+        worker.lm_calls = 100
+        worker.dp_states = 5
+        worker.cache_hits["span"] = 3
+        stats.merge(pickle.loads(pickle.dumps(worker)))
+
+        self.assertEqual(stats.stages, {"lm_scoring": 1.5})
+        self.assertEqual(stats.lm_calls, 100)
+        self.assertEqual(stats.dp_states, 10)
+        self.assertEqual(stats.cache_hits["span"], 3)
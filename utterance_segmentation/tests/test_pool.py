@@ -0,0 +1,168 @@
+import json
+import os
+import signal
+import time
+import unittest
+
+from config import config
+from utterance_segmentation.chunker import Chunker
+from utterance_segmentation.deadline import Cancelled, Deadline
+from utterance_segmentation.pool import (
+    CANCEL_SLOTS,
+    CancelFlag,
+    ChunkerPool,
+    RequestWorker,
+    WorkerLost,
+    _segment,
+)
+from utterance_segmentation.utils import InvalidSSML
+
+
+class ChunkerPoolTest(unittest.TestCase):
+    with open("utterance_segmentation/tests/test_cases.json") as f:
+        test_cases = json.load(f)
+
+    @classmethod
+    def setUpClass(cls):
+        args = (
+            config["chunker_lm_path"],
+            config["max_words_per_sentence"],
+            config["split_by_punctuation"],
+            config["max_total_words"],
+        )
+        cls.chunker = Chunker(*args)
+        cls.pool = ChunkerPool(2, *args, result_cache_size=2 ** 20)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_segment(self):
+        """
+        worker processes chunk exactly like an in-process chunker
+        """
+
+        for segmenter_type in ("lm", "max"):
+            for parse_ssml, text in (
+                (False, self.test_cases["lm"]["input"]),
+                (True, self.test_cases["ssml"]["input"]),
+            ):
+                expected = self.chunker.segment(text, segmenter_type, parse_ssml)
+
+                self.assertEqual(
+                    self.pool.segment(text, segmenter_type, parse_ssml), expected
+                )
+                self.assertEqual(
+                    list(self.pool.iter_segment(text, segmenter_type, parse_ssml)),
+                    expected,
+                )
+
+    def test_with_params(self):
+        """
+        workers chunk with the parameters of the request
+        """
+
+        text = self.test_cases["lm"]["input"]
+        params = dict(max_words_per_sentence=3, split_by_punctuation=False)
+        expected = self.chunker.with_params(**params).segment(text)
+
+        pool = self.pool.with_params(**params)
+        self.assertEqual(pool.segment(text), expected)
+        self.assertEqual(list(pool.iter_segment(text)), expected)
+        self.assertNotEqual(self.pool.segment(text), expected)
+
+    def test_invalid_ssml(self):
+
+        test_case = self.test_cases["ssml_validation"][0]
+
+        with self.assertRaises(InvalidSSML) as raised:
+            self.pool.segment(test_case["input"], parse_ssml=True)
+        self.assertEqual(str(raised.exception), test_case["output"])
+
+        with self.assertRaises(InvalidSSML):
+            list(self.pool.iter_segment(test_case["input"], parse_ssml=True))
+
+    def test_deadline(self):
+        """
+        a pool too busy to chunk within the time budget stops waiting
+        """
+
+        text = self.test_cases["lm"]["input"] + " "
+        busy = [self.pool.pool.apply_async(time.sleep, (1,)) for _ in range(2)]
+        try:
+            with self.assertRaises(Cancelled):
+                self.pool.segment(text, deadline=Deadline(0.1))
+            with self.assertRaises(Cancelled):
+                list(self.pool.iter_segment(text, deadline=Deadline(0.1)))
+            with self.assertRaises(Cancelled):
+                self.pool.segment_page(text, deadline=Deadline(0.1))
+        finally:
+            for task in busy:
+                task.wait()
+
+    def test_cancelled(self):
+        """
+        workers stop chunking requests once cancelled, and count the time
+        they waited for a worker against their budget
+        """
+
+        text = self.test_cases["lm"]["input"] + "  "
+        args = (text, "lm", False, False, {})
+        request = next(self.pool.requests)
+        flag = CancelFlag(self.pool.cancels, request)
+
+        self.assertEqual(_segment(*args, None, request)[1], "lm")
+        self.assertEqual(_segment(*args, time.time() - 1, request)[1], "max")
+        flag.set()
+        with self.assertRaises(Cancelled):
+            _segment(*args, None, request)
+        # Flags sharing the slot don't cancel each other
+        self.assertFalse(CancelFlag(self.pool.cancels, request + CANCEL_SLOTS).is_set())
+
+        deadline = Deadline()
+        chunks = self.pool.iter_segment(text, deadline=deadline)
+        deadline.cancel()
+        with self.assertRaises(Cancelled):
+            list(chunks)
+        self.assertTrue(CancelFlag(self.pool.cancels, request + 1).is_set())
+
+    def test_worker_lost(self):
+        """
+        requests without a time budget stop waiting once their worker died
+        """
+
+        text = " ".join([self.test_cases["lm"]["input"]] * 2000)
+        chunks = self.pool.iter_segment(text, long_document=True)
+        next(chunks)
+        # The stream is the last request numbered
+        worker = RequestWorker(self.pool.workers, next(self.pool.requests) - 1)
+        os.kill(worker.pid(), signal.SIGKILL)
+        with self.assertRaises(WorkerLost):
+            list(chunks)
+
+        # The pool replaced the worker
+        text = self.test_cases["lm"]["input"]
+        self.assertEqual(self.pool.segment(text + "   "), self.chunker.segment(text))
+
+    def test_segment_async(self):
+        """
+        texts submitted at once are chunked by all the workers, and stop
+        once cancelled
+        """
+
+        texts = [self.test_cases["lm"]["input"] + " " * i for i in range(4, 8)]
+        pending = [self.pool.segment_async(text) for text in texts]
+        self.assertEqual(
+            [result.get() for result in pending],
+            [self.chunker.segment(text) for text in texts],
+        )
+
+        busy = [self.pool.pool.apply_async(time.sleep, (0.2,)) for _ in range(2)]
+        try:
+            pending = self.pool.segment_async(texts[-1] + " ")
+            pending.cancel()
+            with self.assertRaises(Cancelled):
+                pending.get()
+        finally:
+            for task in busy:
+                task.wait()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from utterance_segmentation.profiler import (
+    ProfilerBusy,
+    SamplingProfiler,
+    profile,
+    write_profile,
+)
+from utterance_segmentation.utils import InvalidRequest
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_profile(self):
+        """
+        threads keep running while they are sampled, and their stacks are
+        counted in the collapsed format
+        """
+
+        stop = threading.Event()
+        thread = threading.Thread(target=busy_loop, args=(stop,))
+        thread.start()
+        try:
+            profiler = profile(0.2, 0.005)
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertGreater(profiler.samples, 5)
+        lines = profiler.collapsed().splitlines()
+        busy = [line for line in lines if "busy_loop (" in line]
+        self.assertTrue(busy)
+        stack, count = busy[0].rsplit(" ", 1)
+        self.assertTrue(stack.split(";")[-1].startswith("busy_loop ("))
+        self.assertGreater(int(count), 0)
+        # the sampling thread is not sampled
+        self.assertFalse(any("sample (" in line for line in lines))
+
+    def test_one_profile_at_a_time(self):
+
+        SamplingProfiler._running.acquire()
+        try:
+            with self.assertRaises(ProfilerBusy):
+                profile(0.1)
+        finally:
+            SamplingProfiler._running.release()
+
+    def test_invalid(self):
+
+        for seconds, interval in ((0, 0.01), (1, 0)):
+            with self.assertRaises(InvalidRequest):
+                profile(seconds, interval)
+
+    def test_write_profile(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_profile(directory, 0.05)
+            self.assertEqual(os.path.dirname(path), directory)
+            self.assertTrue(os.path.isfile(path))
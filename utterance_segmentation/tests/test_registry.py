@@ -0,0 +1,222 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent import futures
+
+from utterance_segmentation.registry import (
+    ModelLoading,
+    ModelRegistry,
+    ModelWatcher,
+    parse_model_paths,
+    prefault,
+)
+from utterance_segmentation.utils import InvalidRequest
+
+
+class ModelRegistryTest(unittest.TestCase):
+    def setUp(self):
+
+        # model files of 100 bytes
+        self.directory = tempfile.TemporaryDirectory()
+        self.paths = {}
+        for name in ("", "a", "b"):
+            path = os.path.join(self.directory.name, name or "default")
+            with open(path, "wb") as f:
+                f.write(b"x" * 100)
+            self.paths[name] = path
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lazy_loading(self):
+        """
+        models are loaded once, on first use
+        """
+
+        loaded = []
+        registry = ModelRegistry(self.paths, lambda path: loaded.append(path) or path)
+        self.assertEqual(loaded, [])
+
+        self.assertEqual(registry.get("a"), self.paths["a"])
+        self.assertEqual(registry.get("a"), self.paths["a"])
+        self.assertEqual(registry.get(), self.paths[""])
+        self.assertEqual(loaded, [self.paths["a"], self.paths[""]])
+
+        with self.assertRaises(InvalidRequest):
+            registry.get("c")
+
+    def test_eviction(self):
+        """
+        least recently used models are evicted to fit the memory budget
+        """
+
+        registry = ModelRegistry(self.paths, lambda path: path, budget=200)
+        registry.get("")
+        registry.get("a")
+        registry.get("")
+        registry.get("b")
+
+        self.assertEqual(registry.loaded(), ["", "b"])
+        self.assertEqual(
+            registry.stats(),
+            {
+                "loaded": 2,
+                "weight": 200,
+                "budget": 200,
+                "loads": 3,
+                "reloads": 0,
+                "evictions": 1,
+            },
+        )
+
+    def test_failed_load(self):
+        """
+        models failing to load are not counted and are retried
+        """
+
+        def load(path):
+            raise OSError(path)
+
+        registry = ModelRegistry(self.paths, load, budget=200)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                registry.get("a")
+        self.assertEqual(registry.stats()["weight"], 0)
+
+    def test_concurrent_loading(self):
+        """
+        a slow load is done once, requests for its model meanwhile fail
+        right away so they hold up no worker serving another model
+        """
+
+        release = threading.Event()
+        loaded = []
+
+        def load(path):
+            if path == self.paths["a"]:
+                release.wait(5)
+            loaded.append(path)
+            return path
+
+        registry = ModelRegistry(self.paths, load)
+        registry.get("")
+
+        with futures.ThreadPoolExecutor(max_workers=3) as workers:
+            loading = [workers.submit(registry.get, "a") for _ in range(3)]
+            time.sleep(0.05)
+            for result in loading[1:]:
+                with self.assertRaises(ModelLoading):
+                    result.result(1)
+
+            # Served by the workers left once the waiting requests failed
+            started = time.monotonic()
+            for name in ("", "b"):
+                result = workers.submit(registry.get, name)
+                self.assertEqual(result.result(1), self.paths[name])
+            self.assertLess(time.monotonic() - started, 1)
+
+            release.set()
+            self.assertEqual(loading[0].result(5), self.paths["a"])
+        self.assertEqual(registry.get("a"), self.paths["a"])
+        self.assertEqual(loaded.count(self.paths["a"]), 1)
+
+    def test_warm_up(self):
+        """
+        models are loaded if needed and warmed up, their file prefaulted
+        when asked for
+        """
+
+        warmed = []
+        registry = ModelRegistry(self.paths, lambda path: path, warm=warmed.append)
+
+        with self.assertLogs("utterance_segmentation.registry", "INFO") as logs:
+            self.assertEqual(registry.warm_up(prefault_file=True), self.paths[""])
+        self.assertEqual(warmed, [self.paths[""]])
+        self.assertEqual(registry.loaded(), [""])
+        self.assertIn("1 pages prefaulted", logs.output[0])
+        self.assertEqual(prefault(self.paths["a"]), 1)
+
+    def test_reload(self):
+        """
+        reloaded models are warmed up before they replace the loaded ones,
+        models not loaded are left alone
+        """
+
+        warmed = []
+        registry = ModelRegistry(self.paths, lambda path: object(), warm=warmed.append)
+        old = registry.get("a")
+
+        self.assertTrue(registry.reload("a"))
+        new = registry.get("a")
+        self.assertIsNot(new, old)
+        self.assertEqual(warmed, [new])
+        self.assertFalse(registry.reload("b"))
+        self.assertEqual(registry.stats()["reloads"], 1)
+
+        registry.reloadable = False
+        self.assertFalse(registry.reload("a"))
+        self.assertIs(registry.get("a"), new)
+
+    def test_reload_under_traffic(self):
+        """
+        requests are served by the loaded model until the reloaded one is
+        swapped in, without waiting for the reload
+        """
+
+        release = threading.Event()
+        versions = iter(["old", "new"])
+
+        def load(path):
+            version = next(versions)
+            if version == "new":
+                release.wait(5)
+            return version
+
+        registry = ModelRegistry(self.paths, load)
+        registry.get()
+        thread = registry.reload_in_background()
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        self.assertEqual([registry.get() for _ in range(100)], ["old"] * 100)
+        self.assertLess(time.monotonic() - started, 1)
+
+        release.set()
+        thread.join()
+        self.assertEqual(registry.get(), "new")
+
+    def test_watcher(self):
+        """
+        models are reloaded once their moved in file stops changing
+        """
+
+        registry = ModelRegistry(self.paths, lambda path: object())
+        old = registry.get()
+        watcher = ModelWatcher(registry, 60)
+
+        replacement = self.paths[""] + ".new"
+        with open(replacement, "wb") as f:
+            f.write(b"y" * 150)
+        os.replace(replacement, self.paths[""])
+
+        watcher.check()
+        self.assertIs(registry.get(), old)
+        watcher.check()
+        self.assertIsNot(registry.get(), old)
+        self.assertEqual(registry.stats()["weight"], 150)
+
+        reloaded = registry.get()
+        watcher.check()
+        self.assertIs(registry.get(), reloaded)
+
+    def test_parse_model_paths(self):
+
+        self.assertEqual(
+            parse_model_paths(" news=/m/news.bin, gulf=/m/gulf.bin,"),
+            {"news": "/m/news.bin", "gulf": "/m/gulf.bin"},
+        )
+        self.assertEqual(parse_model_paths(""), {})
+        with self.assertRaises(ValueError):
+            parse_model_paths("news")
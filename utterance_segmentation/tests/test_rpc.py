@@ -0,0 +1,209 @@
+import json
+import unittest
+from concurrent import futures
+
+import grpc
+from google.protobuf.wrappers_pb2 import Int32Value
+
+import utterance_segmentation.rpc.utterance_segmentation_pb2 as uspb2
+import utterance_segmentation.rpc.utterance_segmentation_pb2_grpc as uspb2_grpc
+from config import config
+from utterance_segmentation.rpc.utterance_segmentation_servicer import USServicer
+
+
+class RPCTest(unittest.TestCase):
+    with open("utterance_segmentation/tests/test_cases.json") as f:
+        test_cases = json.load(f)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+        uspb2_grpc.add_utterance_segmentationServicer_to_server(
+            USServicer(config), cls.server
+        )
+        port = cls.server.add_insecure_port("localhost:0")
+        cls.server.start()
+
+        cls.channel = grpc.insecure_channel("localhost:{}".format(port))
+        cls.stub = uspb2_grpc.utterance_segmentationStub(cls.channel)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.channel.close()
+        cls.server.stop(None)
+
+    def test_chunk(self):
+
+        response = self.stub.chunk(
+            uspb2.USRequest(text=self.test_cases["lm"]["input"])
+        )
+        self.assertEqual(list(response.text), self.test_cases["lm"]["output"])
+
+    def test_chunk_invalid_ssml(self):
+
+        test_case = self.test_cases["ssml_validation"][0]
+
+        with self.assertRaises(grpc.RpcError) as raised:
+            self.stub.chunk(uspb2.USRequest(text=test_case["input"], parse_ssml=True))
+
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
+        self.assertEqual(raised.exception.details(), test_case["output"])
+
+    def test_chunk_batch(self):
+        """
+        batch responses are in order with a status per item
+        """
+
+        invalid = self.test_cases["ssml_validation"][0]
+        requests = [
+            uspb2.USRequest(text=self.test_cases["lm"]["input"]),
+            uspb2.USRequest(text=invalid["input"], parse_ssml=True),
+            uspb2.USRequest(text=self.test_cases["max"]["input"], segmenter_type="max"),
+            uspb2.USRequest(text=self.test_cases["lm"]["input"]),
+        ]
+
+        response = self.stub.chunk_batch(uspb2.USBatchRequest(requests=requests))
+        lm, ssml, max_, repeated = response.responses
+
+        self.assertEqual(len(response.responses), len(requests))
+        self.assertEqual(lm.status, "OK")
+        self.assertEqual(list(lm.text), self.test_cases["lm"]["output"])
+        self.assertEqual(ssml.status, "INVALID_ARGUMENT")
+        self.assertEqual(ssml.reason, invalid["output"])
+        self.assertEqual(list(max_.text), self.test_cases["max"]["output"])
+        self.assertEqual(repeated, lm)
+
+    def test_chunk_stream(self):
+        """
+        streamed chunks are the chunks of a unary call, one per response
+        """
+
+        for text, parse_ssml in (
+            (self.test_cases["lm"]["input"], False),
+            (self.test_cases["ssml"]["input"], True),
+        ):
+            request = uspb2.USRequest(text=text, parse_ssml=parse_ssml)
+            responses = list(self.stub.chunk_stream(request))
+
+            self.assertTrue(all(len(response.text) == 1 for response in responses))
+            self.assertEqual(
+                [response.text[0] for response in responses],
+                list(self.stub.chunk(request).text),
+            )
+
+    def test_chunk_long_document(self):
+        """
+        pages of a long document are the chunks streamed all at once
+        """
+
+        text = " ".join([self.test_cases["lm"]["input"]] * 20)
+        streamed = [
+            response.text[0]
+            for response in self.stub.chunk_stream(
+                uspb2.USRequest(text=text, long_document=True)
+            )
+        ]
+
+        pages = []
+        offset = 0
+        while True:
+            response = self.stub.chunk(
+                uspb2.USRequest(text=text, long_document=True, offset=offset)
+            )
+            pages.extend(response.text)
+            offset = response.next_offset
+            if not offset:
+                break
+
+        self.assertEqual(pages, streamed)
+        truncated = self.stub.chunk(uspb2.USRequest(text=text))
+        self.assertLess(len(truncated.text), len(pages))
+
+    def test_chunk_offsets(self):
+        """
+        offsets are given per chunk when requested, in both chunk and
+        chunk_stream
+        """
+
+        text = self.test_cases["lm"]["input"]
+        request = uspb2.USRequest(text=text, with_offsets=True)
+        response = self.stub.chunk(request)
+
+        self.assertEqual(len(response.offsets), len(response.text))
+        for chunk, offset in zip(response.text, response.offsets):
+            self.assertEqual(text[offset.start : offset.end].split(), chunk.split())
+        streamed = [
+            (chunk.text[0], chunk.offsets[0])
+            for chunk in self.stub.chunk_stream(request)
+        ]
+        self.assertEqual(streamed, list(zip(response.text, response.offsets)))
+        self.assertFalse(self.stub.chunk(uspb2.USRequest(text=text)).offsets)
+
+    def test_chunk_params(self):
+        """
+        requests can set their own chunker parameters
+        """
+
+        text = self.test_cases["lm"]["input"]
+        request = uspb2.USRequest(
+            text=text, max_words_per_sentence=Int32Value(value=3)
+        )
+        for response in (
+            self.stub.chunk(request),
+            *self.stub.chunk_stream(request),
+        ):
+            self.assertTrue(all(len(chunk.split()) <= 3 for chunk in response.text))
+
+        for max_total_words in (0, config["max_total_words"] + 1):
+            with self.assertRaises(grpc.RpcError) as raised:
+                self.stub.chunk(
+                    uspb2.USRequest(
+                        text=text, max_total_words=Int32Value(value=max_total_words)
+                    )
+                )
+            self.assertEqual(
+                raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT
+            )
+
+    def test_chunk_unknown_model(self):
+
+        request = uspb2.USRequest(text=self.test_cases["lm"]["input"], model="x")
+        with self.assertRaises(grpc.RpcError) as raised:
+            self.stub.chunk(request)
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
+        with self.assertRaises(grpc.RpcError) as raised:
+            list(self.stub.chunk_stream(request))
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
+
+    def test_chunk_stream_invalid_ssml(self):
+
+        test_case = self.test_cases["ssml_validation"][0]
+        request = uspb2.USRequest(text=test_case["input"], parse_ssml=True)
+
+        with self.assertRaises(grpc.RpcError) as raised:
+            list(self.stub.chunk_stream(request))
+
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
+        self.assertEqual(raised.exception.details(), test_case["output"])
+
+    def test_metrics(self):
+
+        self.stub.chunk(uspb2.USRequest(text=self.test_cases["lm"]["input"]))
+        response = self.stub.metrics(uspb2.MetricsRequest())
+
+        self.assertIn(
+            'chunker_request_seconds_count{transport="grpc",method="chunk"}',
+            response.text,
+        )
+        self.assertIn("chunker_models_loaded 1", response.text)
+
+    def test_profile(self):
+
+        response = self.stub.profile(uspb2.ProfileRequest(seconds=0.1))
+        self.assertGreater(response.samples, 0)
+        # the client waiting for the response is sampled
+        self.assertIn("test_profile (", response.collapsed)
+
+        with self.assertRaises(grpc.RpcError) as raised:
+            self.stub.profile(uspb2.ProfileRequest(seconds=-1))
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import unittest
+
+import grpc
+
+import utterance_segmentation.rpc.utterance_segmentation_pb2 as uspb2
+import utterance_segmentation.rpc.utterance_segmentation_pb2_grpc as uspb2_grpc
+from config import config
+from utterance_segmentation.rpc.utterance_segmentation_aio_servicer import (
+    AsyncUSServicer,
+)
+from utterance_segmentation.rpc.utterance_segmentation_servicer import (
+    batch_responses,
+)
+
+
+class AsyncRPCTest(unittest.TestCase):
+    with open("utterance_segmentation/tests/test_cases.json") as f:
+        test_cases = json.load(f)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = asyncio.new_event_loop()
+        cls.servicer = AsyncUSServicer(config)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servicer.executor.shutdown()
+        cls.loop.close()
+
+    def call(self, method, request):
+        """
+        start an asyncio server, call `method` with `request` and return all
+        responses
+        """
+
+        async def call():
+            server = grpc.aio.server()
+            uspb2_grpc.add_utterance_segmentationServicer_to_server(
+                self.servicer, server
+            )
+            port = server.add_insecure_port("localhost:0")
+            await server.start()
+            try:
+                async with grpc.aio.insecure_channel(
+                    "localhost:{}".format(port)
+                ) as channel:
+                    stub = uspb2_grpc.utterance_segmentationStub(channel)
+                    call = getattr(stub, method)(request)
+                    if method == "chunk_stream":
+                        return [response async for response in call]
+                    return [await call]
+            finally:
+                await server.stop(None)
+
+        return self.loop.run_until_complete(call())
+
+    def test_chunk(self):
+
+        request = uspb2.USRequest(text=self.test_cases["lm"]["input"])
+        (response,) = self.call("chunk", request)
+        self.assertEqual(list(response.text), self.test_cases["lm"]["output"])
+
+    def test_metrics(self):
+
+        self.call("chunk", uspb2.USRequest(text=self.test_cases["lm"]["input"]))
+        (response,) = self.call("metrics", uspb2.MetricsRequest())
+        self.assertIn(
+            'chunker_request_seconds_count{transport="grpc",method="chunk"}',
+            response.text,
+        )
+
+    def test_profile(self):
+
+        (response,) = self.call("profile", uspb2.ProfileRequest(seconds=0.1))
+        self.assertGreater(response.samples, 0)
+
+    def test_chunk_invalid_ssml(self):
+
+        test_case = self.test_cases["ssml_validation"][0]
+        request = uspb2.USRequest(text=test_case["input"], parse_ssml=True)
+
+        for method in ("chunk", "chunk_stream"):
+            with self.assertRaises(grpc.RpcError) as raised:
+                self.call(method, request)
+
+            self.assertEqual(raised.exception.code(), grpc.StatusCode.INVALID_ARGUMENT)
+            self.assertEqual(raised.exception.details(), test_case["output"])
+
+    def test_chunk_stream(self):
+        """
+        streamed chunks are the chunks of a unary call, one per response
+        """
+
+        request = uspb2.USRequest(
+            text=self.test_cases["ssml"]["input"], parse_ssml=True
+        )
+        responses = self.call("chunk_stream", request)
+
+        self.assertTrue(all(len(response.text) == 1 for response in responses))
+        self.assertEqual(
+            [response.text[0] for response in responses],
+            list(self.call("chunk", request)[0].text),
+        )
+
+    def test_chunk_batch(self):
+        """
+        batch responses are the same as with the sync servicer
+        """
+
+        invalid = self.test_cases["ssml_validation"][0]
+        request = uspb2.USBatchRequest(
+            requests=[
+                uspb2.USRequest(text=self.test_cases["lm"]["input"]),
+                uspb2.USRequest(text=invalid["input"], parse_ssml=True),
+            ]
+        )
+        (response,) = self.call("chunk_batch", request)
+
+        self.assertEqual(
+            list(response.responses),
+            batch_responses(self.servicer.models, request.requests),
+        )
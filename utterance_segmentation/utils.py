@@ -1,76 +1,184 @@
 import re
 from collections import namedtuple
-from xml.etree import ElementTree as ET
+from xml.parsers import expat
 
 from arabic_analysis import arabic
 
 Verdict = namedtuple("Verdict", ["is_valid", "reason"])
 
 
-def remove_tag(text: str, tag: str) -> str:
-
-    pattern = r"<{0}>|</{0}>".format(tag)
-
-    return re.sub(pattern, "", text)
-
-
-def seperate_on_sentence(text: str) -> list:
-
-    text = re.sub(r"(<break[^>]*>[^>]*</break>|<break[^>]*>)", r"<s>\1</s>", text)
-    text = re.sub(r"(<prosody[^>]*>|</prosody>)", r"<s>\1</s>", text)
-
-    text = re.sub(r"(<p>|</p>|<s>|</s>)", r"\1~~", text)
-    return [remove_tag(remove_tag(chunk, "s"), "p") for chunk in re.split("~~", text)]
+class InvalidRequest(ValueError):
+    """
+    raised for requests that can't be chunked, the message is the reason
+    """
+
+
+class InvalidSSML(InvalidRequest):
+    """
+    raised for SSML that fails validation, the message is the reason
+    """
+
+
+# Structural rules of SSML, reported in this order when several are broken
+SSML_RULES = (
+    '"break" tag not in outer level',
+    '"prosody" tag not in outer level',
+    '"s" tags can only contain text',
+    '"p" tags can only contain text or "s" tags',
+    '"prosody" tags can only contain text, "s" tags or "p" tags',
+)
+OUTER_ONLY = {"break": 0, "prosody": 1}
+# Tags other elements may contain, by rule
+ALLOWED_CHILDREN = {"s": (2, ()), "p": (3, ("s",)), "prosody": (4, ("s", "p"))}
+
+# Tags sentences are split on. Like the other tags, they are only recognized
+# as written here, without attributes or spaces
+SPEAK_TAGS = (b"<speak>", b"</speak>")
+SENTENCE_TAGS = (b"<p>", b"</p>", b"<s>", b"</s>")
+# Start tag of an element, ending with "/>" when it is empty
+START_TAG = re.compile(
+    rb"""<[^\s/>]+(?:\s+[^\s=]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*(/?)>"""
+)
+
+PUNCTUATION_SPACES = re.compile(
+    r"[{}\s]+".format(re.escape("".join(arabic.ARABIC_PUNC | arabic.ENGLISH_PUNC)))
+)
+
+
+class SSMLSplitter(object):
+    """
+    Validates SSML and splits it into sentences in a single pass of the XML
+    parser.
+
+    Sentences are the raw text between "p" and "s" tags, which are dropped,
+    while "break" and "prosody" tags are sentences of their own and "speak"
+    tags are dropped. Text is split at the byte offsets the parser reports for
+    these tags, so the other tags, entities and spaces are kept as written
+    """
+
+    def __init__(self, text):
+
+        self.raw = text.encode()
+        # Open elements and whether their end tag is written in the text,
+        # it is not for empty elements nor elements of entities
+        self.tags = []
+        self.closed = []
+        self.broken = len(SSML_RULES)
+        # (start, end, split) byte ranges dropped from the text, splitting it
+        # when `split` is set
+        self.marks = []
+
+        self.parser = expat.ParserCreate(None, "}")
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.SkippedEntityHandler = self.skipped_entity
+        try:
+            self.parser.Parse(text, True)
+        except expat.ExpatError:
+            raise InvalidSSML("invalid XML")
+        if self.broken < len(SSML_RULES):
+            raise InvalidSSML(SSML_RULES[self.broken])
+
+    def start(self, tag, attributes):
+
+        depth = len(self.tags)
+        if depth >= 2 and tag in OUTER_ONLY:
+            self.broken = min(self.broken, OUTER_ONLY[tag])
+        if depth >= 2 and self.tags[-1] in ALLOWED_CHILDREN:
+            rule, allowed = ALLOWED_CHILDREN[self.tags[-1]]
+            if tag not in allowed:
+                self.broken = min(self.broken, rule)
+
+        raw = self.raw
+        offset = self.parser.CurrentByteIndex
+        start_tag = START_TAG.match(raw, offset)
+        self.tags.append(tag)
+        self.closed.append(start_tag is not None and not start_tag.group(1))
+        if start_tag is None:
+            return
+
+        if raw.startswith(SENTENCE_TAGS, offset):
+            self.marks.append((offset, raw.index(b">", offset) + 1, True))
+        elif raw.startswith(SPEAK_TAGS[0], offset):
+            self.marks.append((offset, offset + len(SPEAK_TAGS[0]), False))
+        elif raw.startswith((b"<break", b"<prosody"), offset):
+            end = raw.index(b">", offset) + 1
+            # A "break" tag along with its text
+            if raw.startswith(b"<break", offset):
+                close = raw.find(b">", end) + 1
+                if close and raw.endswith(b"</break>", end, close):
+                    end = close
+            self.marks.append((offset, offset, True))
+            self.marks.append((end, end, True))
+
+    def end(self, tag):
+
+        self.tags.pop()
+        if not self.closed.pop():
+            return
+
+        raw = self.raw
+        offset = self.parser.CurrentByteIndex
+        if raw.startswith(SENTENCE_TAGS, offset):
+            self.marks.append((offset, raw.index(b">", offset) + 1, True))
+        elif raw.startswith(SPEAK_TAGS[1], offset):
+            self.marks.append((offset, offset + len(SPEAK_TAGS[1]), False))
+        elif raw.startswith(b"</prosody>", offset):
+            end = offset + len(b"</prosody>")
+            self.marks.append((offset, offset, True))
+            self.marks.append((end, end, True))
+
+    def skipped_entity(self, name, is_parameter_entity):
+        # Undefined entities fail parsing, even when the parser can't tell
+        raise expat.ExpatError("undefined entity")
+
+    def sentences(self):
+        """
+        Raw text of the sentences, in order and not stripped
+        """
+
+        raw = self.raw
+        marks = self.marks
+        # Sentences are also split on "~~"
+        offset = raw.find(b"~~")
+        while offset != -1:
+            marks.append((offset, offset + 2, True))
+            offset = raw.find(b"~~", offset + 2)
+        marks.sort()
+
+        sentences = []
+        parts = []
+        offset = 0
+        for start, end, split in marks:
+            parts.append(raw[offset:start])
+            offset = max(offset, end)
+            if split:
+                sentences.append(b"".join(parts).decode())
+                parts = []
+        parts.append(raw[offset:])
+        sentences.append(b"".join(parts).decode())
+        return sentences
+
+
+def split_ssml(text: str) -> list:
+    """
+    Sentences of SSML `text`, see `SSMLSplitter`.
+
+    Raises `InvalidSSML` when `text` is invalid
+    """
+
+    return SSMLSplitter(text).sentences()
 
 
 def sentence_length(text: str) -> int:
 
-    puns = "".join(arabic.ARABIC_PUNC | arabic.ENGLISH_PUNC)
-    pattern = r"[{}\s]+".format(re.escape(puns))
-
-    return len(re.split(pattern, text))
+    return len(PUNCTUATION_SPACES.split(text))
 
 
 def validate_ssml(text: str) -> Verdict:
 
-    # TODO: write as chain of responsibility
-    def is_valid_xml(text):
-        try:
-            return ET.fromstring(text)
-        except ET.ParseError as e:
-            return None
-
-    def in_outer_only(root, tag):
-        outer = root.findall(tag)
-        all = root.findall(".//{}".format(tag))
-        return len(all) - len(outer) == 0
-
-    def has_no_children(element):
-        return len(element) == 0
-
-    def allowed_tags_only(element, allowed_tags):
-        return all(i.tag in allowed_tags for i in element.getchildren())
-
-    root = is_valid_xml(text)
-
-    if root is None:
-        return Verdict(False, "invalid XML")
-
-    elif not in_outer_only(root, "break"):
-        return Verdict(False, '"break" tag not in outer level')
-
-    elif not in_outer_only(root, "prosody"):
-        return Verdict(False, '"prosody" tag not in outer level')
-
-    elif not all(has_no_children(i) for i in root.findall(".//s")):
-        return Verdict(False, '"s" tags can only contain text')
-
-    elif not all(allowed_tags_only(i, {"s"}) for i in root.findall(".//p")):
-        return Verdict(False, '"p" tags can only contain text or "s" tags')
-
-    elif not all(allowed_tags_only(i, {"s", "p"}) for i in root.findall(".//prosody")):
-        return Verdict(
-            False, '"prosody" tags can only contain text, "s" tags or "p" tags'
-        )
-
+    try:
+        SSMLSplitter(text)
+    except InvalidSSML as exception:
+        return Verdict(False, str(exception))
     return Verdict(True, None)